@@ -0,0 +1,75 @@
+# amazon_scraper/cache.py
+
+import hashlib
+import math
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+class LRUCache:
+    """Bounded set-like cache with LRU and age-based eviction"""
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl  # Seconds before an entry expires (None = never)
+        self.evictions = 0  # Entries dropped because the cache was full
+        self._entries = OrderedDict()  # key -> time.monotonic() deadline (None = never)
+
+    def add(self, key: Hashable, age: float = 0.0):
+        """Add key, refreshing its position; age is how many seconds old the entry already is"""
+        self._entries[key] = None if self.ttl is None else time.monotonic() - age + self.ttl
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def update(self, keys):
+        """Add several keys"""
+        for key in keys:
+            self.add(key)
+
+    def __contains__(self, key: Hashable) -> bool:
+        if key not in self._entries:
+            return False
+
+        expires_at = self._entries[key]
+        if expires_at is not None and time.monotonic() > expires_at:
+            del self._entries[key]
+            return False
+
+        self._entries.move_to_end(key)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        """Remove all entries"""
+        self._entries.clear()
+        self.evictions = 0
+
+
+class BloomFilter:
+    """Compact probabilistic set: no false negatives, false positives at about error_rate"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(capacity, 1)
+        self.num_bits = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.num_hashes = max(round(self.num_bits / capacity * math.log(2)), 1)
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, key: Hashable):
+        # Double hashing: derive every bit position from one 128-bit digest
+        digest = hashlib.blake2b(repr(key).encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: Hashable):
+        """Add key"""
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
@@ -1,12 +1,48 @@
 # amazon_scraper/database.py
 
 import logging
+import os
+import queue
+import threading
 import time
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Any
-from pymongo import MongoClient, ASCENDING, DESCENDING
-from pymongo.errors import DuplicateKeyError, ConnectionFailure
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Iterator, Optional, Any
+import bson
+import pymongo
+from bson.raw_bson import RawBSONDocument
+from pymongo import MongoClient, ReturnDocument, UpdateOne, ASCENDING, DESCENDING
+from pymongo.write_concern import WriteConcern
+from pymongo.errors import BulkWriteError, DuplicateKeyError, ConnectionFailure, OperationFailure
 import config
+from amazon_scraper.cache import BloomFilter, LRUCache
+
+def utcnow() -> datetime:
+    """Current UTC time, matching what the server stamps with $currentDate"""
+    return datetime.now(timezone.utc)
+
+def scraped_age(scraped_at: datetime, now: Optional[datetime] = None) -> float:
+    """Seconds since a stored scraped_at (naive datetimes from the driver are UTC)"""
+    if scraped_at.tzinfo is None:
+        scraped_at = scraped_at.replace(tzinfo=timezone.utc)
+    return ((now or utcnow()) - scraped_at).total_seconds()
+
+# Compound index over keyword scrape status (equality fields first, then queue sort keys)
+KEYWORD_QUEUE_INDEX = [
+    ('is_scraped', ASCENDING),
+    ('domain', ASCENDING),
+    ('priority', DESCENDING),
+    ('created_at', ASCENDING)
+]
+
+# Partial index over pending keywords only. The filter holds no config values, so it never
+# needs rebuilding; scraping_attempts stays a query predicate in get_unscraped_keywords
+PENDING_QUEUE_INDEX_NAME = 'pending_queue'
+PENDING_QUEUE_INDEX = [
+    ('domain', ASCENDING),
+    ('priority', DESCENDING),
+    ('created_at', ASCENDING)
+]
+PENDING_QUEUE_FILTER = {'is_scraped': False}
 
 class DatabaseManager:
     """MongoDB database manager for Amazon scraper"""
@@ -14,13 +50,29 @@ class DatabaseManager:
     def __init__(self):
         self.client = None
         self.db = None
+        self.products_collection = None
+        self.keywords_collection = None
+        self.products_refresh_collection = None  # Unacknowledged (w=0) handle for refreshes
         self.logger = logging.getLogger(__name__)
-        self._asin_cache = set()  # Cache for scraped ASINs
-        self._keyword_cache = set()  # Cache for scraped keywords
+        self._asin_cache = LRUCache(  # Cache for scraped (ASIN, domain) pairs
+            config.ASIN_CACHE_SIZE,
+            ttl=config.DUPLICATE_CHECK_TIMEFRAME_DAYS * 86400
+        )
+        self._asin_cache_preloaded = False  # True when the cache holds every recent ASIN
+        self._asin_bloom = None  # Every recent ASIN, so LRU misses can skip MongoDB
+        self._pending_queue_ready = False  # True once pending_queue exists with PENDING_QUEUE_FILTER
+        self._asin_lock = threading.Lock()  # Products may be written from a background thread
+        self._keyword_cache = set()  # Cache for scraped (keyword, domain, category) triples
+        self._keyword_updates = None  # Queue of pending keyword UpdateOne ops
+        self._keyword_writer = None  # Background thread draining _keyword_updates
         self.connect()
         self.setup_indexes()
         if config.PRELOAD_SCRAPED_ASINS:
             self.preload_caches()
+        if config.PREWARM_KEYWORD_QUEUE and config.USE_MONGODB_INDEXES:
+            self.prewarm_keyword_queue()
+        if config.ENABLE_ASYNC_DB_OPERATIONS:
+            self._start_keyword_writer()
     
     def connect(self):
         """Connect to MongoDB"""
@@ -29,12 +81,26 @@ class DatabaseManager:
                 config.get_mongodb_url(),
                 serverSelectionTimeoutMS=config.MONGODB_CONNECTION_TIMEOUT,
                 socketTimeoutMS=config.MONGODB_SOCKET_TIMEOUT,
-                maxPoolSize=config.MONGODB_MAX_POOL_SIZE
+                maxPoolSize=config.MONGODB_MAX_POOL_SIZE,
+                minPoolSize=config.MONGODB_MIN_POOL_SIZE,
+                maxIdleTimeMS=config.MONGODB_MAX_IDLE_TIME_MS,
+                waitQueueTimeoutMS=config.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+                retryWrites=True,
+                compressors=config.MONGODB_COMPRESSORS,
+                zlibCompressionLevel=config.MONGODB_ZLIB_COMPRESSION_LEVEL
             )
             self.db = self.client[config.MONGODB_DATABASE]
-            # Test connection
-            self.client.server_info()
+            self.products_collection = self.db[config.get_collection_name('products')]
+            self.keywords_collection = self.db[config.get_collection_name('keywords')]
+            self.products_refresh_collection = self.products_collection.with_options(
+                write_concern=WriteConcern(w=0)
+            )
+            # Test connection (also opens the first pooled socket before any real query)
+            self.client.admin.command('ping')
             self.logger.info(f"Connected to MongoDB: {config.MONGODB_DATABASE}")
+            if not (bson.has_c() and pymongo.has_c()):
+                # Products are BSON-encoded per write; the pure-Python encoder is far slower
+                self.logger.warning("PyMongo C extensions are not available; BSON encoding will be slow")
         except ConnectionFailure as e:
             self.logger.error(f"Failed to connect to MongoDB: {e}")
             raise
@@ -46,80 +112,192 @@ class DatabaseManager:
         
         try:
             # Product collection indexes
-            products_collection = self.db[config.get_collection_name('products')]
+            products_collection = self.products_collection
             products_collection.create_index([('ASIN', ASCENDING), ('domain', ASCENDING)], unique=True)
             products_collection.create_index([('scraped_at', DESCENDING)])
-            products_collection.create_index([('keyword', ASCENDING)])
-            products_collection.create_index([('BestSellerRank', ASCENDING)])
+            if config.INDEX_BEST_SELLER_RANK:
+                products_collection.create_index([('BestSellerRank', ASCENDING)], sparse=True)
+            
+            # No query filters products by keyword; drop the index left by older versions
+            self._drop_legacy_indexes(products_collection, ['keyword_1'])
             
             # Keywords collection indexes
-            keywords_collection = self.db[config.get_collection_name('keywords')]
+            keywords_collection = self.keywords_collection
             keywords_collection.create_index([
                 ('keyword', ASCENDING), 
                 ('domain', ASCENDING), 
                 ('category', ASCENDING)
             ], unique=True)
-            keywords_collection.create_index([('is_scraped', ASCENDING)])
-            keywords_collection.create_index([('priority', DESCENDING)])
+            # Serves is_scraped lookups (cache preload, stats) in key order
+            keywords_collection.create_index(KEYWORD_QUEUE_INDEX)
             keywords_collection.create_index([('created_at', DESCENDING)])
             
+            # Standalone is_scraped/priority indexes are covered by the queue index prefix
+            self._drop_legacy_indexes(keywords_collection, ['is_scraped_1', 'priority_-1'])
+            
             self.logger.info("Database indexes created successfully")
         except Exception as e:
             self.logger.error(f"Error creating indexes: {e}")
+        
+        # Partial index holding only pending keywords, used by get_unscraped_keywords
+        try:
+            self._ensure_pending_queue_index(self.keywords_collection)
+        except Exception as e:
+            self.logger.error(f"Error creating {PENDING_QUEUE_INDEX_NAME} index: {e}")
+    
+    def _ensure_pending_queue_index(self, collection):
+        """Create the pending-queue partial index, rebuilding one left with a different filter"""
+        existing = collection.index_information().get(PENDING_QUEUE_INDEX_NAME)
+        if existing and existing.get('partialFilterExpression') != PENDING_QUEUE_FILTER:
+            # create_index would fail with an options conflict on the old filter
+            collection.drop_index(PENDING_QUEUE_INDEX_NAME)
+            self.logger.info(f"Dropped {PENDING_QUEUE_INDEX_NAME} index with an outdated filter")
+        collection.create_index(
+            PENDING_QUEUE_INDEX,
+            name=PENDING_QUEUE_INDEX_NAME,
+            partialFilterExpression=PENDING_QUEUE_FILTER
+        )
+        self._pending_queue_ready = True
+    
+    def _find_pending_keywords(self, make_cursor) -> Iterator:
+        """Iterate make_cursor() hinted to pending_queue, rerunning it unhinted if the hint is rejected"""
+        if config.USE_MONGODB_INDEXES and self._pending_queue_ready:
+            started = False
+            try:
+                for doc in make_cursor().hint(PENDING_QUEUE_INDEX_NAME):
+                    started = True
+                    yield doc
+                return
+            except OperationFailure as e:
+                if started:
+                    raise
+                self.logger.warning(f"{PENDING_QUEUE_INDEX_NAME} hint rejected, querying without it: {e}")
+        yield from make_cursor()
+    
+    def _drop_legacy_indexes(self, collection, index_names: List[str]):
+        """Drop indexes created by older versions that are no longer used"""
+        existing = collection.index_information()
+        for index_name in index_names:
+            if index_name in existing:
+                collection.drop_index(index_name)
+                self.logger.info(f"Dropped legacy index {index_name} on {collection.name}")
     
     def preload_caches(self):
         """Preload frequently accessed data into memory"""
         try:
             # Load scraped ASINs
             if config.PREVENT_DUPLICATE_PRODUCTS:
-                cutoff_date = datetime.now() - timedelta(days=config.DUPLICATE_CHECK_TIMEFRAME_DAYS)
-                products = self.db[config.get_collection_name('products')].find(
+                cutoff_date = utcnow() - timedelta(days=config.DUPLICATE_CHECK_TIMEFRAME_DAYS)
+                products = self.products_collection.find(
                     {'scraped_at': {'$gte': cutoff_date}},
-                    {'ASIN': 1, 'domain': 1}
+                    {'ASIN': 1, 'domain': 1, 'scraped_at': 1, '_id': 0}
+                ).batch_size(config.PRELOAD_CURSOR_BATCH_SIZE)
+                if config.USE_MONGODB_INDEXES:
+                    products = products.hint([('scraped_at', DESCENDING)])
+                
+                self._asin_cache.clear()
+                self._asin_bloom = BloomFilter(
+                    max(self.products_collection.estimated_document_count(), config.ASIN_CACHE_SIZE),
+                    config.ASIN_BLOOM_ERROR_RATE
                 )
-                self._asin_cache = {f"{p['ASIN']}_{p.get('domain', 'us')}" for p in products}
+                now = utcnow()
+                for p in products:
+                    # Entries expire when the product leaves the window, not a full window after preload
+                    self._remember_product((p['ASIN'], p.get('domain', 'us')), scraped_age(p['scraped_at'], now))
+                self._asin_cache_preloaded = True
                 self.logger.info(f"Preloaded {len(self._asin_cache)} ASINs into cache")
             
             # Load scraped keywords
             if config.PREVENT_DUPLICATE_KEYWORDS:
-                keywords = self.db[config.get_collection_name('keywords')].find(
+                keywords = self.keywords_collection.find(
                     {'is_scraped': True},
-                    {'keyword': 1, 'domain': 1, 'category': 1}
-                )
-                self._keyword_cache = {
-                    f"{k['keyword']}_{k.get('domain', 'us')}_{k.get('category', '')}" 
-                    for k in keywords
-                }
+                    {'keyword': 1, 'domain': 1, 'category': 1, '_id': 0}
+                ).batch_size(config.PRELOAD_CURSOR_BATCH_SIZE)
+                if config.USE_MONGODB_INDEXES:
+                    keywords = keywords.hint(KEYWORD_QUEUE_INDEX)
+                
+                keyword_cache = set()
+                for k in keywords:
+                    keyword_cache.add((k['keyword'], k.get('domain', 'us'), k.get('category', '')))
+                self._keyword_cache = keyword_cache
                 self.logger.info(f"Preloaded {len(self._keyword_cache)} keywords into cache")
                 
         except Exception as e:
             self.logger.error(f"Error preloading caches: {e}")
     
+    def prewarm_keyword_queue(self):
+        """Walk the pending keyword queue once so its index and documents are in server memory"""
+        try:
+            cursor = self._find_pending_keywords(lambda: self.keywords_collection.find(
+                {
+                    'is_scraped': False,
+                    'scraping_attempts': {'$lt': config.MAX_KEYWORD_SCRAPING_ATTEMPTS}
+                },
+                {'_id': 1}
+            ).batch_size(config.PRELOAD_CURSOR_BATCH_SIZE))
+            
+            warmed = sum(1 for _ in cursor)
+            self.logger.info(f"Prewarmed {warmed} pending keywords")
+        except Exception as e:
+            self.logger.error(f"Error prewarming keyword queue: {e}")
+    
     def is_product_scraped(self, asin: str, domain: str = 'us') -> bool:
         """Check if product is already scraped (fast cache lookup)"""
         if not config.PREVENT_DUPLICATE_PRODUCTS:
             return False
         
-        cache_key = f"{asin}_{domain}"
-        return cache_key in self._asin_cache
+        cache_key = (asin, domain)
+        with self._asin_lock:
+            if cache_key in self._asin_cache:
+                return True
+            
+            # A miss is authoritative only if the preload fit in the cache
+            if self._asin_cache_preloaded and self._asin_cache.evictions == 0:
+                return False
+            
+            # Otherwise the bloom filter rules out most new products without a query
+            if self._asin_cache_preloaded and cache_key not in self._asin_bloom:
+                return False
+        
+        try:
+            cutoff_date = utcnow() - timedelta(days=config.DUPLICATE_CHECK_TIMEFRAME_DAYS)
+            existing = self.products_collection.find_one(
+                {'ASIN': asin, 'domain': domain, 'scraped_at': {'$gte': cutoff_date}},
+                {'scraped_at': 1, '_id': 0}
+            )
+        except Exception as e:
+            self.logger.error(f"Error checking product {asin}: {e}")
+            return False
+        
+        if existing:
+            self._remember_product(cache_key, scraped_age(existing['scraped_at']))
+            return True
+        return False
+    
+    def _remember_product(self, cache_key: tuple, age: float = 0.0):
+        """Record a scraped (ASIN, domain) pair, scraped age seconds ago, in the cache and bloom filter"""
+        with self._asin_lock:
+            self._asin_cache.add(cache_key, age)
+            if self._asin_bloom is not None:
+                self._asin_bloom.add(cache_key)
     
     def is_keyword_scraped(self, keyword: str, domain: str = 'us', category: str = '') -> bool:
         """Check if keyword is already scraped (fast cache lookup)"""
         if not config.PREVENT_DUPLICATE_KEYWORDS:
             return False
         
-        cache_key = f"{keyword}_{domain}_{category}"
-        return cache_key in self._keyword_cache
+        return (keyword, domain, category) in self._keyword_cache
     
     def insert_product(self, product_data: Dict) -> bool:
         """Insert product into database"""
         try:
             # Add metadata
-            product_data['scraped_at'] = datetime.now()
-            product_data['updated_at'] = datetime.now()
+            now = utcnow()
+            product_data['scraped_at'] = now
+            product_data['updated_at'] = now
             product_data['scrape_count'] = 1
             
-            collection = self.db[config.get_collection_name('products')]
+            collection = self.products_collection
             
             if config.PRODUCT_UPDATE_EXISTING:
                 # Upsert: update if exists, insert if new
@@ -133,8 +311,8 @@ class DatabaseManager:
                 )
                 
                 # Update cache
-                cache_key = f"{product_data['ASIN']}_{product_data.get('domain', 'us')}"
-                self._asin_cache.add(cache_key)
+                cache_key = (product_data['ASIN'], product_data.get('domain', 'us'))
+                self._remember_product(cache_key)
                 
                 return True
             else:
@@ -142,8 +320,8 @@ class DatabaseManager:
                 collection.insert_one(product_data)
                 
                 # Update cache
-                cache_key = f"{product_data['ASIN']}_{product_data.get('domain', 'us')}"
-                self._asin_cache.add(cache_key)
+                cache_key = (product_data['ASIN'], product_data.get('domain', 'us'))
+                self._remember_product(cache_key)
                 
                 return True
                 
@@ -160,73 +338,112 @@ class DatabaseManager:
             return 0
         
         try:
-            # Add metadata to all products
-            now = datetime.now()
-            for product in products:
-                product['scraped_at'] = now
-                product['updated_at'] = now
-                product['scrape_count'] = 1
-            
-            collection = self.db[config.get_collection_name('products')]
+            collection = self.products_collection
             
             if config.PRODUCT_UPDATE_EXISTING:
-                # Use replace_one for each product individually (more reliable)
-                inserted_count = 0
+                # Upsert all products with unordered bulk writes (one round-trip per chunk).
+                # Metadata is stamped server-side; each product is BSON-encoded once up front
+                # so the driver copies the raw bytes into every (re)sent command.
+                new_ops = []
+                refresh_ops = []
                 for product in products:
-                    try:
-                        result = collection.replace_one(
-                            {
-                                'ASIN': product['ASIN'],
-                                'domain': product.get('domain', 'us')
-                            },
-                            product,
-                            upsert=True
-                        )
-                        if result.upserted_id or result.modified_count > 0:
-                            inserted_count += 1
-                    except Exception as e:
-                        self.logger.error(f"Error inserting product {product.get('ASIN')}: {e}")
-                        continue
+                    op = UpdateOne(
+                        {
+                            'ASIN': product['ASIN'],
+                            'domain': product.get('domain', 'us')
+                        },
+                        {
+                            '$set': RawBSONDocument(bson.encode(product)),
+                            '$currentDate': {'scraped_at': True, 'updated_at': True},
+                            '$inc': {'scrape_count': 1}
+                        },
+                        upsert=True
+                    )
+                    # Products already in the cache are refreshes of stored data
+                    with self._asin_lock:
+                        is_refresh = (product['ASIN'], product.get('domain', 'us')) in self._asin_cache
+                    if is_refresh:
+                        refresh_ops.append(op)
+                    else:
+                        new_ops.append(op)
+                
+                inserted_count = self._bulk_upsert(collection, new_ops)
+                if config.UNACKNOWLEDGED_PRODUCT_REFRESH:
+                    # Fire-and-forget: the driver does not wait for the server to confirm,
+                    # so these are reported separately and never counted as stored
+                    self._bulk_upsert(self.products_refresh_collection, refresh_ops)
+                    if refresh_ops:
+                        self.logger.info(f"Sent {len(refresh_ops)} product refreshes unacknowledged")
+                else:
+                    inserted_count += self._bulk_upsert(collection, refresh_ops)
             else:
-                # Simple bulk insert
-                try:
-                    result = collection.insert_many(products, ordered=False)
-                    inserted_count = len(result.inserted_ids)
-                except Exception as e:
-                    self.logger.error(f"Bulk insert failed, trying individual inserts: {e}")
-                    # Fallback to individual inserts
-                    inserted_count = 0
-                    for product in products:
-                        try:
-                            collection.insert_one(product)
-                            inserted_count += 1
-                        except Exception:
-                            continue
+                # Insert only products not stored yet - the unique (ASIN, domain) index
+                # resolves duplicates server-side, so no per-product existence check is needed.
+                # Existing documents must stay untouched, so metadata is stamped client-side
+                # into $setOnInsert rather than with $currentDate/$inc.
+                now = utcnow()
+                ops = []
+                for product in products:
+                    product['scraped_at'] = now
+                    product['updated_at'] = now
+                    product['scrape_count'] = 1
+                    ops.append(UpdateOne(
+                        {
+                            'ASIN': product['ASIN'],
+                            'domain': product.get('domain', 'us')
+                        },
+                        {'$setOnInsert': RawBSONDocument(bson.encode(product))},
+                        upsert=True
+                    ))
+                inserted_count = self._bulk_upsert(collection, ops)
             
             # Update cache
             for product in products:
-                cache_key = f"{product['ASIN']}_{product.get('domain', 'us')}"
-                self._asin_cache.add(cache_key)
+                cache_key = (product['ASIN'], product.get('domain', 'us'))
+                self._remember_product(cache_key)
             
-            self.logger.info(f"Successfully inserted {inserted_count} products")
+            self.logger.info(f"Successfully inserted/updated {inserted_count} products")
             return inserted_count
             
         except Exception as e:
             self.logger.error(f"Error bulk inserting products: {e}")
             return 0
     
+    def _bulk_upsert(self, collection, ops: List[UpdateOne], batch_size: int = None, raise_errors: bool = False) -> int:
+        """Run upserts in unordered bulk_write chunks, return upserted + modified count"""
+        acknowledged = collection.write_concern.acknowledged
+        count = 0
+        batch_size = batch_size or config.BULK_WRITE_BATCH_SIZE
+        for start in range(0, len(ops), batch_size):
+            try:
+                result = collection.bulk_write(
+                    ops[start:start + batch_size],
+                    ordered=False,
+                    # Not allowed with unacknowledged writes
+                    bypass_document_validation=acknowledged
+                )
+                if acknowledged:
+                    count += result.upserted_count + result.modified_count
+            except BulkWriteError as e:
+                details = e.details
+                count += details.get('nUpserted', 0) + details.get('nModified', 0)
+                self.logger.error(f"Bulk upsert reported {len(details.get('writeErrors', []))} errors")
+                if raise_errors:
+                    raise
+        return count
+    
     def insert_keyword(self, keyword_data: Dict) -> bool:
         """Insert keyword into database"""
         try:
             # Add metadata
-            keyword_data['created_at'] = datetime.now()
+            keyword_data['created_at'] = utcnow()
             keyword_data['is_scraped'] = False
             keyword_data['scraping_attempts'] = 0
             keyword_data['success_count'] = 0
             keyword_data['error_count'] = 0
             keyword_data['products_found'] = 0
             
-            collection = self.db[config.get_collection_name('keywords')]
+            collection = self.keywords_collection
             collection.insert_one(keyword_data)
             
             self.logger.debug(f"Inserted keyword: {keyword_data['keyword']}")
@@ -240,57 +457,52 @@ class DatabaseManager:
             return False
     
     def bulk_insert_keywords(self, keywords: List[Dict]) -> int:
-        """Bulk insert keywords with duplicate handling"""
+        """Bulk insert keywords, skipping ones already stored; see bulk_upsert_keywords"""
+        return self.bulk_upsert_keywords(keywords) or 0
+
+    def bulk_upsert_keywords(self, keywords: List[Dict]) -> Optional[int]:
+        """Insert keywords not yet stored, letting the unique index skip existing ones; None if the write failed"""
         if not keywords:
             return 0
         
         try:
-            # Add metadata
-            now = datetime.now()
+            now = utcnow()
+            ops = []
             for keyword in keywords:
-                keyword['created_at'] = now
-                keyword['is_scraped'] = False
-                keyword['scraping_attempts'] = 0
-                keyword['success_count'] = 0
-                keyword['error_count'] = 0
-                keyword['products_found'] = 0
+                key = {
+                    'keyword': keyword['keyword'],
+                    'domain': keyword['domain'],
+                    'category': keyword['category']
+                }
+                doc = dict(keyword)
+                for field in key:
+                    doc.pop(field)
+                doc.update({
+                    'created_at': now,
+                    'is_scraped': False,
+                    'scraping_attempts': 0,
+                    'success_count': 0,
+                    'error_count': 0,
+                    'products_found': 0
+                })
+                ops.append(UpdateOne(key, {'$setOnInsert': doc}, upsert=True))
             
-            collection = self.db[config.get_collection_name('keywords')]
+            # Existing keywords match the filter and are left untouched, so the
+            # count only includes newly inserted keywords
+            upserted_count = self._bulk_upsert(
+                self.keywords_collection, ops, config.KEYWORD_INSERT_BATCH_SIZE, raise_errors=True
+            )
+            self.logger.info(f"Bulk upserted {upserted_count} new keywords")
+            return upserted_count
             
-            # Method 1: Try bulk insert with ordered=False to continue on duplicates
-            try:
-                result = collection.insert_many(keywords, ordered=False)
-                inserted_count = len(result.inserted_ids)
-                self.logger.info(f"Bulk inserted {inserted_count} keywords")
-                return inserted_count
-            except Exception as bulk_error:
-                # If bulk insert fails due to duplicates, insert individually
-                self.logger.warning(f"Bulk insert failed, trying individual inserts: {bulk_error}")
-                
-                inserted_count = 0
-                for keyword_data in keywords:
-                    try:
-                        collection.insert_one(keyword_data)
-                        inserted_count += 1
-                        self.logger.debug(f"Inserted keyword: {keyword_data['keyword']}")
-                    except Exception as e:
-                        if 'duplicate key error' in str(e).lower() or '11000' in str(e):
-                            self.logger.debug(f"Keyword already exists: {keyword_data['keyword']}")
-                        else:
-                            self.logger.error(f"Error inserting keyword {keyword_data['keyword']}: {e}")
-                        continue
-                
-                self.logger.info(f"Individually inserted {inserted_count} new keywords")
-                return inserted_count
-                
         except Exception as e:
-            self.logger.error(f"Error bulk inserting keywords: {e}")
-            return 0
+            self.logger.error(f"Error bulk upserting keywords: {e}")
+            return None
 
-    def get_unscraped_keywords(self, limit: int = None, domain: str = 'us') -> List[Dict]:
-        """Get unscraped keywords from database"""
+    def get_unscraped_keywords(self, limit: int = None, domain: str = 'us') -> Iterator[Dict]:
+        """Stream unscraped keywords from database in priority order"""
         try:
-            collection = self.db[config.get_collection_name('keywords')]
+            collection = self.keywords_collection
             
             query = {
                 'is_scraped': False,
@@ -298,120 +510,201 @@ class DatabaseManager:
             }
             
             # Limit scraping attempts
-            max_attempts = 3
-            query['scraping_attempts'] = {'$lt': max_attempts}
+            query['scraping_attempts'] = {'$lt': config.MAX_KEYWORD_SCRAPING_ATTEMPTS}
             
-            cursor = collection.find(query).sort([
-                ('priority', DESCENDING),
-                ('created_at', ASCENDING)
-            ])
+            def make_cursor():
+                cursor = collection.find(query).sort([
+                    ('priority', DESCENDING),
+                    ('created_at', ASCENDING)
+                ])
+                if limit:
+                    cursor = cursor.limit(limit)
+                return cursor.batch_size(config.KEYWORD_CURSOR_BATCH_SIZE)
             
-            if limit:
-                cursor = cursor.limit(limit)
-            
-            keywords = list(cursor)
-            self.logger.info(f"Found {len(keywords)} unscraped keywords for domain {domain}")
-            return keywords
+            yield from self._find_pending_keywords(make_cursor)
             
         except Exception as e:
             self.logger.error(f"Error fetching unscraped keywords: {e}")
-            return []
     
     def mark_keyword_scraped(self, keyword: str, domain: str, category: str, products_found: int = 0):
         """Mark keyword as scraped"""
         try:
-            collection = self.db[config.get_collection_name('keywords')]
+            collection = self.keywords_collection
             
-            # First, check if the keyword document exists
             query = {
                 'keyword': keyword,
                 'domain': domain,
                 'category': category
             }
+            update = {
+                '$set': {
+                    'is_scraped': True,
+                    'scraped_at': utcnow(),
+                    'products_found': products_found
+                },
+                '$inc': {
+                    'success_count': 1
+                }
+            }
             
-            existing_doc = collection.find_one(query)
-            if not existing_doc:
-                self.logger.warning(f"No keyword document found for: keyword='{keyword}', domain='{domain}', category='{category}'")
-                
-                # Try to find with just keyword and domain
-                partial_query = {'keyword': keyword, 'domain': domain}
-                partial_doc = collection.find_one(partial_query)
-                if partial_doc:
-                    self.logger.warning(f"Found keyword with different category: {partial_doc}")
-                else:
-                    self.logger.warning(f"No keyword document found even with partial query: {partial_query}")
-                    
-                    # Check if keyword exists with any domain/category
-                    any_keyword = collection.find_one({'keyword': keyword})
-                    if any_keyword:
-                        self.logger.warning(f"Keyword exists but with different domain/category: {any_keyword}")
-                    else:
-                        self.logger.error(f"Keyword '{keyword}' does not exist in database at all!")
-                return False
-            
-            self.logger.info(f"Found keyword document to update: {existing_doc}")
+            if self._keyword_writer:
+                # Hand off to the background writer; missing documents are reported there
+                self._keyword_updates.put(UpdateOne(query, update))
+                self._keyword_cache.add((keyword, domain, category))
+                return True
             
-            result = collection.update_one(
+            updated_doc = collection.find_one_and_update(
                 query,
-                {
-                    '$set': {
-                        'is_scraped': True,
-                        'scraped_at': datetime.now(),
-                        'products_found': products_found
-                    },
-                    '$inc': {
-                        'success_count': 1
-                    }
-                }
+                update,
+                projection={'_id': 1},
+                return_document=ReturnDocument.AFTER
             )
             
-            if result.modified_count > 0:
-                # Update cache
-                cache_key = f"{keyword}_{domain}_{category}"
-                self._keyword_cache.add(cache_key)
-                self.logger.info(f"Successfully marked keyword as scraped: {keyword}")
-                return True
-            else:
-                self.logger.error(f"Update query matched document but modified_count was 0 for keyword: {keyword}")
+            if updated_doc is None:
+                self.logger.warning(f"No keyword document found for: keyword='{keyword}', domain='{domain}', category='{category}'")
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self._log_missing_keyword(collection, keyword, domain)
                 return False
             
+            # Update cache
+            cache_key = (keyword, domain, category)
+            self._keyword_cache.add(cache_key)
+            self.logger.info(f"Successfully marked keyword as scraped: {keyword}")
+            return True
+            
         except Exception as e:
             self.logger.error(f"Error marking keyword as scraped: {e}")
         
         return False
     
+    def _log_missing_keyword(self, collection, keyword: str, domain: str):
+        """Diagnose why a keyword document could not be found (debug only)"""
+        partial_query = {'keyword': keyword, 'domain': domain}
+        partial_doc = collection.find_one(partial_query)
+        if partial_doc:
+            self.logger.debug(f"Found keyword with different category: {partial_doc}")
+            return
+        
+        any_keyword = collection.find_one({'keyword': keyword})
+        if any_keyword:
+            self.logger.debug(f"Keyword exists but with different domain/category: {any_keyword}")
+        else:
+            self.logger.debug(f"Keyword '{keyword}' does not exist in database at all!")
+    
     def increment_keyword_attempts(self, keyword: str, domain: str, category: str):
         """Increment scraping attempts for keyword"""
+        query = {
+            'keyword': keyword,
+            'domain': domain,
+            'category': category
+        }
+        update = {
+            '$inc': {'scraping_attempts': 1},
+            '$set': {'last_attempt_at': utcnow()}
+        }
+        
+        if self._keyword_writer:
+            self._keyword_updates.put(UpdateOne(query, update))
+            return
+        
         try:
-            collection = self.db[config.get_collection_name('keywords')]
-            collection.update_one(
-                {
-                    'keyword': keyword,
-                    'domain': domain,
-                    'category': category
-                },
-                {
-                    '$inc': {'scraping_attempts': 1},
-                    '$set': {'last_attempt_at': datetime.now()}
-                }
-            )
+            self.keywords_collection.update_one(query, update)
         except Exception as e:
             self.logger.error(f"Error incrementing keyword attempts: {e}")
     
+    def bulk_increment_keyword_attempts(self, attempts: Dict[tuple, int]):
+        """Apply accumulated attempt counts, keyed by (keyword, domain, category), in one batch"""
+        if not attempts:
+            return
+        
+        now = utcnow()
+        ops = [
+            UpdateOne(
+                {'keyword': keyword, 'domain': domain, 'category': category},
+                {'$inc': {'scraping_attempts': count}, '$set': {'last_attempt_at': now}}
+            )
+            for (keyword, domain, category), count in attempts.items()
+        ]
+        
+        if self._keyword_writer:
+            for op in ops:
+                self._keyword_updates.put(op)
+            return
+        
+        for start in range(0, len(ops), config.KEYWORD_UPDATE_BATCH_SIZE):
+            self._write_keyword_updates(ops[start:start + config.KEYWORD_UPDATE_BATCH_SIZE])
+    
+    def _start_keyword_writer(self):
+        """Start the background thread that batches keyword updates"""
+        self._keyword_updates = queue.Queue()
+        self._keyword_writer = threading.Thread(
+            target=self._keyword_writer_loop,
+            name='keyword-writer',
+            daemon=True
+        )
+        self._keyword_writer.start()
+    
+    def _keyword_writer_loop(self):
+        """Drain queued keyword updates into bulk writes until a None sentinel arrives"""
+        stopping = False
+        while not stopping:
+            op = self._keyword_updates.get()
+            if op is None:
+                self._keyword_updates.task_done()
+                break
+            
+            # Collect up to a full batch, waiting at most the flush interval
+            ops = [op]
+            deadline = time.monotonic() + config.KEYWORD_UPDATE_FLUSH_INTERVAL
+            while len(ops) < config.KEYWORD_UPDATE_BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    op = self._keyword_updates.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if op is None:
+                    self._keyword_updates.task_done()
+                    stopping = True
+                    break
+                ops.append(op)
+            
+            self._write_keyword_updates(ops)
+            for _ in ops:
+                self._keyword_updates.task_done()
+    
+    def _write_keyword_updates(self, ops: List[UpdateOne]):
+        """Apply a batch of keyword updates in one unordered bulk write"""
+        try:
+            result = self.keywords_collection.bulk_write(ops, ordered=False)
+            if result.matched_count < len(ops):
+                self.logger.warning(f"{len(ops) - result.matched_count} keyword updates matched no document")
+        except Exception as e:
+            self.logger.error(f"Error writing {len(ops)} keyword updates: {e}")
+    
+    def flush_keyword_updates(self):
+        """Block until all queued keyword updates have been written"""
+        if self._keyword_writer:
+            self._keyword_updates.join()
+    
     def get_scraping_stats(self) -> Dict:
         """Get scraping statistics"""
         try:
-            products_collection = self.db[config.get_collection_name('products')]
-            keywords_collection = self.db[config.get_collection_name('keywords')]
+            products_collection = self.products_collection
+            keywords_collection = self.keywords_collection
+            index_hint = {'hint': [('scraped_at', DESCENDING)]} if config.USE_MONGODB_INDEXES else {}
             
             stats = {
-                'total_products': products_collection.count_documents({}),
-                'total_keywords': keywords_collection.count_documents({}),
+                # Totals come from collection metadata instead of a full scan
+                'total_products': products_collection.estimated_document_count(),
+                'total_keywords': keywords_collection.estimated_document_count(),
                 'scraped_keywords': keywords_collection.count_documents({'is_scraped': True}),
                 'pending_keywords': keywords_collection.count_documents({'is_scraped': False}),
-                'products_today': products_collection.count_documents({
-                    'scraped_at': {'$gte': datetime.now().replace(hour=0, minute=0, second=0)}
-                }),
+                'products_today': products_collection.count_documents(
+                    {'scraped_at': {'$gte': utcnow().replace(hour=0, minute=0, second=0, microsecond=0)}},
+                    **index_hint
+                ),
                 'cache_size': {
                     'asins': len(self._asin_cache),
                     'keywords': len(self._keyword_cache)
@@ -426,23 +719,45 @@ class DatabaseManager:
     
     def close(self):
         """Close database connection"""
+        if self._keyword_writer:
+            self._keyword_updates.put(None)
+            self._keyword_writer.join()
+            self._keyword_writer = None
+        
         if self.client:
             self.client.close()
             self.logger.info("Database connection closed")
 
-# Global database manager instance
+# Global database manager instance (one per process)
 db_manager = None
+db_manager_pid = None
+_db_manager_lock = threading.Lock()
 
 def get_db_manager() -> DatabaseManager:
-    """Get global database manager instance"""
-    global db_manager
-    if db_manager is None:
-        db_manager = DatabaseManager()
-    return db_manager
+    """Get database manager instance for the current process"""
+    global db_manager, db_manager_pid
+    with _db_manager_lock:
+        if db_manager is not None and db_manager_pid != os.getpid():
+            # Inherited across fork - the parent's client and pool are not usable here
+            db_manager = None
+        if db_manager is None:
+            # Created once and shared by every pipeline, spider and generator thread
+            db_manager = DatabaseManager()
+            db_manager_pid = os.getpid()
+        return db_manager
 
 def close_db_connection():
     """Close global database connection"""
     global db_manager
     if db_manager:
         db_manager.close()
-        db_manager = None
\ No newline at end of file
+        db_manager = None
+
+def _discard_db_manager_after_fork():
+    """Drop the parent's manager in a forked child without touching its sockets"""
+    global db_manager, _db_manager_lock
+    db_manager = None
+    _db_manager_lock = threading.Lock()  # Another thread may have held it at fork time
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_discard_db_manager_after_fork)
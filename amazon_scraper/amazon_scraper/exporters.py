@@ -0,0 +1,58 @@
+# amazon_scraper/exporters.py
+
+from scrapy.exporters import JsonItemExporter, JsonLinesItemExporter
+import config
+
+try:
+    import orjson  # Optional: much faster feed serialization
+except ImportError:
+    orjson = None
+
+
+def _orjson_options():
+    """orjson flags matching the JSON output settings in config"""
+    option = orjson.OPT_NON_STR_KEYS
+    if config.JSON_INDENT:
+        option |= orjson.OPT_INDENT_2
+    return option
+
+
+class _OrjsonEncoder:
+    """Stand-in for ScrapyJSONEncoder; types orjson can't handle fall back to Scrapy's encoder"""
+
+    def __init__(self, fallback, option):
+        self.fallback = fallback
+        self.option = option
+
+    def encode(self, obj):
+        return orjson.dumps(obj, default=self.fallback.default, option=self.option).decode('utf-8')
+
+
+class OrjsonItemExporter(JsonItemExporter):
+    """JSON array feed exporter encoding items with orjson when installed"""
+
+    def __init__(self, file, **kwargs):
+        super().__init__(file, **kwargs)
+        # orjson never escapes non-ASCII, so ensure_ascii output keeps the stdlib encoder
+        if orjson is not None and not config.JSON_ENSURE_ASCII:
+            self.encoder = _OrjsonEncoder(self.encoder, _orjson_options())
+
+
+class OrjsonLinesItemExporter(JsonLinesItemExporter):
+    """JSON Lines feed exporter writing orjson's UTF-8 bytes straight to the file"""
+
+    def __init__(self, file, **kwargs):
+        super().__init__(file, **kwargs)
+        self.use_orjson = (
+            orjson is not None and not config.JSON_ENSURE_ASCII
+            and (self.encoding or 'utf-8').lower().replace('-', '') == 'utf8'
+        )
+        # Scrapy's encoder handles the types orjson doesn't (Decimal, sets, items)
+        self.fallback_default = self.encoder.default
+
+    def export_item(self, item):
+        if not self.use_orjson:
+            return super().export_item(item)
+        itemdict = dict(self._get_serialized_fields(item))
+        self.file.write(orjson.dumps(itemdict, default=self.fallback_default,
+                                     option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE))
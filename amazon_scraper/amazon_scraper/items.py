@@ -1,57 +1,91 @@
 # amazon_scraper/items.py
 
-import scrapy
-from scrapy import Item, Field
+import sys
+import warnings
+from dataclasses import dataclass, fields
+from typing import Optional
 
-class AmazonProductItem(scrapy.Item):
+# Fields dropped as duplicates, mapped to the field that carries the same value
+RENAMED_FIELDS = {
+    'Prime': 'IsPrime',
+    'SellerName': 'SoldBy',
+    'FastestDeliveryDate': 'DeliveryEstimateFastest',
+    'SlowestDeliveryDate': 'DeliveryEstimateSlowest',
+}
+
+def slotted_dataclass(cls):
+    """dataclass(slots=True), with the slotted class rebuilt by hand before Python 3.10"""
+    if sys.version_info >= (3, 10):
+        return dataclass(slots=True)(cls)
+    cls = dataclass(cls)
+    names = tuple(f.name for f in fields(cls))
+    # Defaults live in the generated __init__, so the class attributes can make way for slots
+    namespace = {key: value for key, value in cls.__dict__.items()
+                 if key not in names and key not in ('__dict__', '__weakref__')}
+    namespace['__slots__'] = names
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+@slotted_dataclass
+class AmazonProductItem:
     # Product identifiers
-    ASIN = Field()
-    Title = Field()
-    ProductURL = Field()
-    
+    ASIN: Optional[str] = None
+    Title: Optional[str] = None
+    ProductURL: Optional[str] = None
+
     # Ratings and reviews
-    StarRating = Field()
-    NumberOfRatings = Field()
-    
+    StarRating: Optional[float] = None
+    NumberOfRatings: Optional[int] = None
+
     # Pricing
-    Price = Field()
-    ShippingCost = Field()
-    
+    Price: Optional[float] = None
+    ShippingCost: Optional[float] = None
+
     # Rankings
-    BestSellerRank = Field()
-    SalesSubRank = Field()
-    SalesSubSubRank = Field()
-    
+    BestSellerRank: Optional[int] = None
+    SalesSubRank: Optional[str] = None
+    SalesSubSubRank: Optional[int] = None
+
     # Delivery information
-    FastestDelivery = Field()
-    DeliveryEstimateFastest = Field()
-    DeliveryEstimateSlowest = Field()
-    DeliveryDaysFastest = Field()
-    DeliveryDaysSlowest = Field()
-    FastestDeliveryDate = Field()
-    SlowestDeliveryDate = Field()
-    
+    FastestDelivery: Optional[str] = None
+    DeliveryEstimateFastest: Optional[str] = None
+    DeliveryEstimateSlowest: Optional[str] = None
+    DeliveryDaysFastest: Optional[int] = None
+    DeliveryDaysSlowest: Optional[int] = None
+
     # Seller information
-    SellerOffersCount = Field()
-    DispatchesFrom = Field()
-    SoldBy = Field()
-    SellerName = Field()
-    IsBuyBoxWinner = Field()
-    FulfilledBy = Field()
-    CustomerServiceProvider = Field()
-    
+    SellerOffersCount: Optional[int] = None
+    DispatchesFrom: Optional[str] = None
+    SoldBy: Optional[str] = None
+    IsBuyBoxWinner: Optional[bool] = None
+    FulfilledBy: Optional[str] = None
+    CustomerServiceProvider: Optional[str] = None
+
     # Prime and availability
-    IsPrime = Field()
-    Prime = Field()
-    AvailableQuantity = Field()
-    
+    IsPrime: Optional[bool] = None
+    AvailableQuantity: Optional[str] = None
+
     # Product details
-    Brand = Field()
-    ListingDate = Field()
-    
+    Brand: Optional[str] = None
+    ListingDate: Optional[str] = None
+
     # Scraping metadata
-    ScrapedAt = Field()
-    Keyword = Field()
-    Domain = Field()
-    PageNumber = Field()
-    DeliveryDays = Field()
\ No newline at end of file
+    ScrapedAt: Optional[str] = None
+    Keyword: Optional[str] = None
+    Domain: Optional[str] = None
+    PageNumber: Optional[int] = None
+    DeliveryDays: Optional[int] = None
+
+    def __getattr__(self, name):
+        """Resolve a removed duplicate field to its canonical field, with a deprecation warning"""
+        canonical = RENAMED_FIELDS.get(name)
+        if canonical is None:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+        warnings.warn(f"{name} is deprecated, use {canonical}", DeprecationWarning, stacklevel=2)
+        return getattr(self, canonical)
+
+    def to_dict(self) -> dict:
+        """Return item fields as a plain dict (shallow, unlike dataclasses.asdict)"""
+        return {name: getattr(self, name) for name in ITEM_FIELD_NAMES}
+
+
+ITEM_FIELD_NAMES = tuple(f.name for f in fields(AmazonProductItem))
@@ -1,19 +1,104 @@
 # amazon_scraper/keyword_generator.py
 
 import logging
-import time
 import random
-from typing import List, Dict, Set
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import cached_property, lru_cache
+from typing import List, Dict
 from datetime import datetime
 import config
+from amazon_scraper.cache import LRUCache
 from amazon_scraper.database import get_db_manager
 
+# Keyword priority scoring
+HIGH_PRIORITY_CATEGORIES = frozenset({'Electronics', 'Home & Kitchen'})
+TRENDING_WORDS_PATTERN = re.compile('wireless|smart|portable|gaming|bluetooth')
+
+# Placeholder keyword generation - hardcoded keyword sets for different categories
+KEYWORD_TEMPLATES = {
+    'Electronics': (
+        'wireless headphones', 'bluetooth speaker', 'smartphone case', 'laptop stand',
+        'usb cable', 'wireless charger', 'gaming mouse', 'mechanical keyboard',
+        'webcam', 'tablet', 'smart watch', 'power bank', 'bluetooth earbuds',
+        'monitor', 'hdmi cable', 'wireless adapter'
+    ),
+    'Home & Kitchen': (
+        'coffee machine', 'air fryer', 'blender', 'toaster', 'microwave',
+        'pressure cooker', 'kitchen knife set', 'cutting board', 'mixing bowl',
+        'coffee grinder', 'food processor', 'stand mixer', 'rice cooker',
+        'slow cooker', 'electric kettle', 'can opener'
+    ),
+    'Sports & Outdoors': (
+        'running shoes', 'yoga mat', 'dumbbell set', 'resistance bands',
+        'treadmill', 'bicycle', 'camping tent', 'hiking backpack',
+        'water bottle', 'fitness tracker', 'golf clubs', 'tennis racket',
+        'basketball', 'soccer ball', 'swimming goggles', 'gym bag'
+    ),
+    'Health & Personal Care': (
+        'electric toothbrush', 'hair dryer', 'face cream', 'shampoo',
+        'body lotion', 'sunscreen', 'vitamins', 'protein powder',
+        'massage gun', 'blood pressure monitor', 'thermometer',
+        'first aid kit', 'hand sanitizer', 'face mask', 'hair straightener'
+    ),
+    'Clothing & Accessories': (
+        'sneakers', 't-shirt', 'jeans', 'dress', 'jacket',
+        'handbag', 'sunglasses', 'watch', 'belt', 'scarf',
+        'hoodie', 'socks', 'underwear', 'shoes', 'backpack', 'wallet'
+    ),
+    'Books': (
+        'fiction book', 'cookbook', 'self help book', 'biography',
+        'mystery novel', 'romance novel', 'science book', 'history book',
+        'children book', 'textbook', 'comic book', 'poetry book',
+        'travel guide', 'art book', 'business book', 'psychology book'
+    ),
+    'Toys & Games': (
+        'lego set', 'board game', 'puzzle', 'action figure',
+        'doll', 'remote control car', 'video game', 'card game',
+        'building blocks', 'stuffed animal', 'educational toy',
+        'outdoor toy', 'craft kit', 'musical toy', 'science kit'
+    ),
+    'Automotive': (
+        'car charger', 'phone mount', 'dash cam', 'car vacuum',
+        'tire gauge', 'jumper cables', 'car cover', 'floor mats',
+        'air freshener', 'car wax', 'motor oil', 'brake pads',
+        'headlights', 'car battery', 'windshield wipers'
+    ),
+    'Beauty': (
+        'makeup brush set', 'lipstick', 'foundation', 'mascara',
+        'eyeshadow palette', 'nail polish', 'perfume', 'skincare set',
+        'face serum', 'moisturizer', 'cleanser', 'hair mask',
+        'nail file', 'makeup remover', 'concealer', 'blush'
+    ),
+    'Office Products': (
+        'notebook', 'pen set', 'stapler', 'paper clips',
+        'desk organizer', 'office chair', 'desk lamp', 'printer paper',
+        'file folders', 'calculator', 'whiteboard', 'desk pad',
+        'hole punch', 'tape dispenser', 'paper shredder', 'label maker'
+    )
+}
+
+DEFAULT_KEYWORD_TEMPLATE = (
+    'wireless headphones', 'laptop', 'smartphone', 'gaming chair',
+    'bluetooth speaker', 'coffee machine', 'running shoes', 'tablet'
+)
+
+# Brand and color/size prefixes used to simulate different searches
+VARIATION_BRANDS = ('apple', 'samsung', 'sony', 'amazon', 'nike', 'adidas')
+VARIATION_MODIFIERS = ('black', 'white', 'small', 'large', 'wireless', 'portable')
+
 class KeywordGenerator:
     """Generate and manage keywords for Amazon scraping"""
     
     def __init__(self):
         self.logger = logging.getLogger(__name__)
-        self.db_manager = get_db_manager()
+        # (keyword, domain, category) keys already written by this process
+        self._seen = LRUCache(config.KEYWORD_SEEN_CACHE_SIZE)
+    
+    @cached_property
+    def db_manager(self):
+        """Database manager, connected on first use"""
+        return get_db_manager()
         
     def generate_keywords_for_categories(self, categories: List[str] = None, domain: str = 'us') -> int:
         """Generate keywords for specified categories"""
@@ -24,153 +109,127 @@ class KeywordGenerator:
         if categories is None:
             categories = config.PRODUCT_CATEGORIES
         
-        total_generated = 0
+        generated = self._generate_all_categories(categories, domain)
         
+        # Collect keyword documents for every category so they are written in large batches
+        all_docs = []
         for category in categories:
-            self.logger.info(f"Generating keywords for category: {category}")
-            
-            # Generate keywords multiple times for variety
-            category_keywords = set()
-            
-            for attempt in range(config.GENERATION_PROMPTS_COUNT):
+            # Prepare keyword documents for database; existing keywords are skipped by the upsert
+            candidates = generated[category]
+            for keyword in candidates:
+                keyword_doc = {
+                    'keyword': keyword,
+                    'category': category,
+                    'domain': domain,
+                    'priority': self._calculate_keyword_priority(keyword, category),
+                    'generated_by': 'openai'  # Will be 'placeholder' for now
+                }
+                all_docs.append(keyword_doc)
+            self.logger.debug("Prepared %d keywords for category: %s", len(candidates), category)
+        
+        # Bulk upsert keywords (chunked by KEYWORD_INSERT_BATCH_SIZE in the database manager)
+        total_generated = self._upsert_unseen_keywords(all_docs)
+        
+        self.logger.info(f"Total keywords generated: {total_generated}")
+        return total_generated
+    
+    def _generate_all_categories(self, categories: List[str], domain: str) -> Dict[str, List[str]]:
+        """Run generation prompts for every category concurrently (bounded by a worker pool)
+        
+        Keywords are kept in first-seen order and each category stops collecting, and
+        cancels its pending prompts, once it has KEYWORDS_PER_CATEGORY unique keywords.
+        """
+        limit = config.KEYWORDS_PER_CATEGORY
+        generated: Dict[str, Dict[str, None]] = {category: {} for category in categories}
+        jobs = [
+            (category, attempt)
+            for category in categories
+            for attempt in range(config.GENERATION_PROMPTS_COUNT)
+        ]
+        if not jobs:
+            return {category: [] for category in categories}
+        
+        self.logger.info(f"Generating keywords for categories: {', '.join(categories)}")
+        max_workers = min(config.KEYWORD_GENERATION_MAX_CONCURRENCY, len(jobs))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self._generate_keywords_for_category, category, domain): (category, attempt)
+                for category, attempt in jobs
+            }
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                category, attempt = futures[future]
+                category_keywords = generated[category]
+                if len(category_keywords) >= limit:
+                    continue
                 try:
-                    keywords = self._generate_keywords_for_category(category, domain)
-                    category_keywords.update(keywords)
-                    self.logger.debug(f"Generated {len(keywords)} keywords for {category} (attempt {attempt + 1})")
-                    
-                    # Add delay between API calls
-                    if attempt < config.GENERATION_PROMPTS_COUNT - 1:
-                        time.sleep(1)
-                        
+                    keywords = future.result()
+                    for keyword in keywords:
+                        category_keywords.setdefault(keyword, None)
+                        if len(category_keywords) >= limit:
+                            break
+                    self.logger.debug("Generated %d keywords for %s (attempt %d)", len(keywords), category, attempt + 1)
                 except Exception as e:
                     self.logger.error(f"Error generating keywords for {category} (attempt {attempt + 1}): {e}")
-                    continue
-            
-            # Prepare keyword documents for database
-            keyword_docs = []
-            for keyword in list(category_keywords)[:config.KEYWORDS_PER_CATEGORY]:
-                # Check if keyword already exists
-                if not self.db_manager.is_keyword_scraped(keyword, domain, category):
-                    keyword_doc = {
-                        'keyword': keyword.strip(),
-                        'category': category,
-                        'domain': domain,
-                        'priority': self._calculate_keyword_priority(keyword, category),
-                        'generated_by': 'openai'  # Will be 'placeholder' for now
-                    }
-                    keyword_docs.append(keyword_doc)
-            
-            # Bulk insert keywords
-            if keyword_docs:
-                inserted_count = self.db_manager.bulk_insert_keywords(keyword_docs)
-                total_generated += inserted_count
-                self.logger.info(f"Inserted {inserted_count} new keywords for category: {category}")
-            else:
-                self.logger.info(f"No new keywords to insert for category: {category}")
+                
+                # Category is full: skip its prompts that have not started yet
+                if len(category_keywords) >= limit:
+                    for other, (other_category, _) in futures.items():
+                        if other_category == category:
+                            other.cancel()
         
-        self.logger.info(f"Total keywords generated: {total_generated}")
-        return total_generated
+        return {category: list(keywords) for category, keywords in generated.items()}
     
     def _generate_keywords_for_category(self, category: str, domain: str) -> List[str]:
         """Generate keywords for a specific category"""
         # PLACEHOLDER IMPLEMENTATION - Replace with OpenAI API call
-        return self._placeholder_keyword_generation(category, domain)
+        keywords = self._placeholder_keyword_generation(category, domain)
+        # Normalize once here so later dedup, priority scoring and storage use the same form
+        return [keyword.strip().lower() for keyword in keywords]
     
     def _placeholder_keyword_generation(self, category: str, domain: str) -> List[str]:
         """Placeholder keyword generation with hardcoded values"""
-        # Hardcoded keyword sets for different categories
-        keyword_templates = {
-            'Electronics': [
-                'wireless headphones', 'bluetooth speaker', 'smartphone case', 'laptop stand',
-                'usb cable', 'wireless charger', 'gaming mouse', 'mechanical keyboard',
-                'webcam', 'tablet', 'smart watch', 'power bank', 'bluetooth earbuds',
-                'monitor', 'hdmi cable', 'wireless adapter'
-            ],
-            'Home & Kitchen': [
-                'coffee machine', 'air fryer', 'blender', 'toaster', 'microwave',
-                'pressure cooker', 'kitchen knife set', 'cutting board', 'mixing bowl',
-                'coffee grinder', 'food processor', 'stand mixer', 'rice cooker',
-                'slow cooker', 'electric kettle', 'can opener'
-            ],
-            'Sports & Outdoors': [
-                'running shoes', 'yoga mat', 'dumbbell set', 'resistance bands',
-                'treadmill', 'bicycle', 'camping tent', 'hiking backpack',
-                'water bottle', 'fitness tracker', 'golf clubs', 'tennis racket',
-                'basketball', 'soccer ball', 'swimming goggles', 'gym bag'
-            ],
-            'Health & Personal Care': [
-                'electric toothbrush', 'hair dryer', 'face cream', 'shampoo',
-                'body lotion', 'sunscreen', 'vitamins', 'protein powder',
-                'massage gun', 'blood pressure monitor', 'thermometer',
-                'first aid kit', 'hand sanitizer', 'face mask', 'hair straightener'
-            ],
-            'Clothing & Accessories': [
-                'sneakers', 't-shirt', 'jeans', 'dress', 'jacket',
-                'handbag', 'sunglasses', 'watch', 'belt', 'scarf',
-                'hoodie', 'socks', 'underwear', 'shoes', 'backpack', 'wallet'
-            ],
-            'Books': [
-                'fiction book', 'cookbook', 'self help book', 'biography',
-                'mystery novel', 'romance novel', 'science book', 'history book',
-                'children book', 'textbook', 'comic book', 'poetry book',
-                'travel guide', 'art book', 'business book', 'psychology book'
-            ],
-            'Toys & Games': [
-                'lego set', 'board game', 'puzzle', 'action figure',
-                'doll', 'remote control car', 'video game', 'card game',
-                'building blocks', 'stuffed animal', 'educational toy',
-                'outdoor toy', 'craft kit', 'musical toy', 'science kit'
-            ],
-            'Automotive': [
-                'car charger', 'phone mount', 'dash cam', 'car vacuum',
-                'tire gauge', 'jumper cables', 'car cover', 'floor mats',
-                'air freshener', 'car wax', 'motor oil', 'brake pads',
-                'headlights', 'car battery', 'windshield wipers'
-            ],
-            'Beauty': [
-                'makeup brush set', 'lipstick', 'foundation', 'mascara',
-                'eyeshadow palette', 'nail polish', 'perfume', 'skincare set',
-                'face serum', 'moisturizer', 'cleanser', 'hair mask',
-                'nail file', 'makeup remover', 'concealer', 'blush'
-            ],
-            'Office Products': [
-                'notebook', 'pen set', 'stapler', 'paper clips',
-                'desk organizer', 'office chair', 'desk lamp', 'printer paper',
-                'file folders', 'calculator', 'whiteboard', 'desk pad',
-                'hole punch', 'tape dispenser', 'paper shredder', 'label maker'
-            ]
-        }
-        
         # Get keywords for the category
-        base_keywords = keyword_templates.get(category, [
-            'wireless headphones', 'laptop', 'smartphone', 'gaming chair',
-            'bluetooth speaker', 'coffee machine', 'running shoes', 'tablet'
-        ])
-        
-        # Add some variation and randomness
-        variations = []
-        for keyword in base_keywords:
-            variations.append(keyword)
-            
-            # Add brand variations (simulate different searches)
-            if random.random() < 0.3:  # 30% chance
-                brands = ['apple', 'samsung', 'sony', 'amazon', 'nike', 'adidas']
-                brand = random.choice(brands)
-                variations.append(f"{brand} {keyword}")
-            
-            # Add color/size variations
-            if random.random() < 0.2:  # 20% chance
-                modifiers = ['black', 'white', 'small', 'large', 'wireless', 'portable']
-                modifier = random.choice(modifiers)
-                variations.append(f"{modifier} {keyword}")
-        
-        # Randomly select keywords to return
-        num_to_return = min(config.KEYWORDS_PER_CATEGORY, len(variations))
-        selected_keywords = random.sample(variations, num_to_return)
-        
-        self.logger.debug(f"Generated {len(selected_keywords)} placeholder keywords for {category}")
+        base_keywords = KEYWORD_TEMPLATES.get(category, DEFAULT_KEYWORD_TEMPLATE)
+        
+        # Randomly select keywords to return - reservoir sampling over the streamed
+        # variations keeps only KEYWORDS_PER_CATEGORY of them in memory
+        k = config.KEYWORDS_PER_CATEGORY
+        selected_keywords = []
+        for i, keyword in enumerate(self._iter_variations(base_keywords)):
+            if i < k:
+                selected_keywords.append(keyword)
+            else:
+                j = random.randint(0, i)
+                if j < k:
+                    selected_keywords[j] = keyword
+        random.shuffle(selected_keywords)
+        
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Generated %d placeholder keywords for %s", len(selected_keywords), category)
         return selected_keywords
     
+    @staticmethod
+    def _iter_variations(base_keywords):
+        """Yield base keywords followed by random brand and color/size variations"""
+        # Add some variation and randomness - draw all coin flips and picks in bulk
+        n = len(base_keywords)
+        brand_mask = random.choices((True, False), weights=(0.3, 0.7), k=n)  # 30% chance
+        brand_picks = random.choices(VARIATION_BRANDS, k=n)
+        modifier_mask = random.choices((True, False), weights=(0.2, 0.8), k=n)  # 20% chance
+        modifier_picks = random.choices(VARIATION_MODIFIERS, k=n)
+        
+        yield from base_keywords
+        # Add brand variations (simulate different searches)
+        for keyword, brand, use in zip(base_keywords, brand_picks, brand_mask):
+            if use:
+                yield f"{brand} {keyword}"
+        # Add color/size variations
+        for keyword, modifier, use in zip(base_keywords, modifier_picks, modifier_mask):
+            if use:
+                yield f"{modifier} {keyword}"
+    
     def _openai_generate_keywords(self, category: str, domain: str) -> List[str]:
         """Generate keywords using OpenAI API (placeholder for now)"""
         # TODO: Implement OpenAI API integration
@@ -184,19 +243,19 @@ class KeywordGenerator:
         priority = 5  # Default priority
         
         # Higher priority for shorter, more specific keywords
-        if len(keyword.split()) == 2:
+        word_count = len(keyword.split())
+        if word_count == 2:
             priority += 2
-        elif len(keyword.split()) == 1:
+        elif word_count == 1:
             priority += 1
         
         # Higher priority for certain categories
-        high_priority_categories = ['Electronics', 'Home & Kitchen']
-        if category in high_priority_categories:
+        if category in HIGH_PRIORITY_CATEGORIES:
             priority += 1
         
-        # Higher priority for trending keywords
-        trending_words = ['wireless', 'smart', 'portable', 'gaming', 'bluetooth']
-        if any(word in keyword.lower() for word in trending_words):
+        # Higher priority for trending keywords (substring match, e.g. "smartphone");
+        # generated keywords are already lowercase
+        if TRENDING_WORDS_PATTERN.search(keyword):
             priority += 1
         
         return min(priority, 10)  # Cap at 10
@@ -206,30 +265,45 @@ class KeywordGenerator:
         """Add manual keywords to database"""
         keyword_docs = []
         
-        for keyword in keywords:
-            if not self.db_manager.is_keyword_scraped(keyword, domain, category):
-                keyword_doc = {
-                    'keyword': keyword.strip(),
-                    'category': category,
-                    'domain': domain,
-                    'priority': priority,
-                    'generated_by': 'manual'
-                }
-                keyword_docs.append(keyword_doc)
+        for keyword in dict.fromkeys(keyword.strip() for keyword in keywords):
+            keyword_doc = {
+                'keyword': keyword,
+                'category': category,
+                'domain': domain,
+                'priority': priority,
+                'generated_by': 'manual'
+            }
+            keyword_docs.append(keyword_doc)
         
         if keyword_docs:
-            inserted_count = self.db_manager.bulk_insert_keywords(keyword_docs)
+            inserted_count = self._upsert_unseen_keywords(keyword_docs)
             self.logger.info(f"Added {inserted_count} manual keywords")
             return inserted_count
         
         return 0
     
-    def get_keywords_for_scraping(self, limit: int = None, domain: str = 'us') -> List[str]:
-        """Get keywords that need to be scraped"""
-        keyword_docs = self.db_manager.get_unscraped_keywords(limit, domain)
-        keywords = [doc['keyword'] for doc in keyword_docs]
+    def _upsert_unseen_keywords(self, keyword_docs: List[Dict]) -> int:
+        """Upsert keywords this process has not written before, return inserted count"""
+        unseen = [
+            doc for doc in keyword_docs
+            if (doc['keyword'], doc['domain'], doc['category']) not in self._seen
+        ]
+        if not unseen:
+            return 0
+        
+        inserted_count = self.db_manager.bulk_upsert_keywords(unseen)
+        if inserted_count is None:
+            return 0  # Not written; keep them out of _seen so a later call retries
+        self._seen.update((doc['keyword'], doc['domain'], doc['category']) for doc in unseen)
+        return inserted_count
+    
+    def get_keywords_for_scraping(self, limit: int = None, domain: str = 'us') -> Dict[str, int]:
+        """Get keywords that need to be scraped, mapped to their priority (highest first)"""
+        keywords = {}
+        for doc in self.db_manager.get_unscraped_keywords(limit, domain):
+            keywords.setdefault(doc['keyword'], doc.get('priority', 0))
         
-        self.logger.info(f"Retrieved {len(keywords)} keywords for scraping")
+        self.logger.info(f"Retrieved {len(keywords)} keywords for scraping for domain {domain}")
         return keywords
     
     def cleanup_old_keywords(self, days_old: int = 90):
@@ -237,12 +311,7 @@ class KeywordGenerator:
         # This can be implemented to remove keywords that consistently fail
         pass
 
-# Global keyword generator instance
-keyword_generator = None
-
+@lru_cache(maxsize=1)
 def get_keyword_generator() -> KeywordGenerator:
     """Get global keyword generator instance"""
-    global keyword_generator
-    if keyword_generator is None:
-        keyword_generator = KeywordGenerator()
-    return keyword_generator
\ No newline at end of file
+    return KeywordGenerator()
@@ -2,11 +2,28 @@
 
 from scrapy import signals
 from scrapy.downloadermiddlewares.useragent import UserAgentMiddleware
+from scrapy.http import Headers
+from twisted.internet import task
+from itertools import accumulate
 import random
 import logging
 import config
 import time
 import requests
+import re
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Markers of Amazon's bot-check page, matched case-insensitively on the raw body
+BLOCK_PAGE_PATTERN = re.compile(rb'robot check|captcha', re.IGNORECASE)
+
+# Shared HTTP session so ScrapeOps refreshes reuse pooled connections
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=4,
+    max_retries=Retry(total=2, backoff_factor=0.3)
+))
 
 class AmazonScraperSpiderMiddleware:
     """Spider middleware for Amazon scraper"""
@@ -39,6 +56,10 @@ class AmazonScraperSpiderMiddleware:
 class AmazonScraperDownloaderMiddleware:
     """Downloader middleware for Amazon scraper"""
     
+    def __init__(self):
+        # Additional headers from config, encoded to bytes once and applied to every request
+        self.default_headers = Headers(config.DEFAULT_HEADERS)
+    
     @classmethod
     def from_crawler(cls, crawler):
         s = cls()
@@ -47,8 +68,7 @@ class AmazonScraperDownloaderMiddleware:
 
     def process_request(self, request, spider):
         # additional headers from config
-        for header, value in config.DEFAULT_HEADERS.items():
-            request.headers[header] = value
+        request.headers.update(self.default_headers)
         
         return None
 
@@ -57,7 +77,10 @@ class AmazonScraperDownloaderMiddleware:
         if response.status == 503:
             spider.logger.warning(f"503 Service Unavailable for {request.url}")
             
-        if "robot check" in response.text.lower() or "captcha" in response.text.lower():
+        # Block pages are small; skip scanning large successful product pages
+        body = response.body
+        might_be_blocked = response.status in (403, 503) or len(body) < config.CAPTCHA_SCAN_MAX_BYTES
+        if might_be_blocked and BLOCK_PAGE_PATTERN.search(body):
             spider.logger.warning(f"CAPTCHA detected for {request.url}")
             if config.LOG_BLOCKED_REQUESTS:
                 user_agent = request.headers.get('User-Agent', b'').decode('utf-8')
@@ -80,24 +103,41 @@ class DynamicUserAgentMiddleware(UserAgentMiddleware):
         self.user_agent = user_agent
         self.logger = logging.getLogger(__name__)
         self.user_agent_list = []
+        self._ua_bytes = []  # user_agent_list encoded once, set on requests as-is
+        self._ua_cum_weights = None  # Cumulative selection weights, only for the fallback list
         self.last_refresh = 0
         self.strategy = config.USER_AGENT_STRATEGY
+        self._ua_cycle = iter(())  # Shuffled pass over user_agent_list
+        self._refresh_loop = None  # Periodic refresh while a spider is open
         
         # Initialize user agent list
         self.refresh_user_agents()
 
     @classmethod
     def from_crawler(cls, crawler):
-        return cls(
+        middleware = cls(
             user_agent=crawler.settings.get('USER_AGENT')
         )
+        crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def spider_opened(self, spider):
+        super().spider_opened(spider)
+        # Refresh on a timer instead of checking the interval on every request
+        self._refresh_loop = task.LoopingCall(self.refresh_user_agents, force=True)
+        self._refresh_loop.start(config.USER_AGENT_REFRESH_INTERVAL, now=False)
 
-    def refresh_user_agents(self):
+    def spider_closed(self, spider):
+        if self._refresh_loop and self._refresh_loop.running:
+            self._refresh_loop.stop()
+
+    def refresh_user_agents(self, force=False):
         """Refresh user agent list from configured source"""
         current_time = time.time()
         
         # Check if refresh is needed
-        if (current_time - self.last_refresh) < config.USER_AGENT_REFRESH_INTERVAL and self.user_agent_list:
+        if not force and (current_time - self.last_refresh) < config.USER_AGENT_REFRESH_INTERVAL and self.user_agent_list:
             return
         
         new_agents = []
@@ -113,12 +153,21 @@ class DynamicUserAgentMiddleware(UserAgentMiddleware):
                 new_agents = self._fetch_fake_useragent()
         
         # Use fallback user agents if no dynamic source worked
+        self._ua_cum_weights = None
         if not new_agents:
             self.logger.warning("Failed to fetch dynamic user agents, using fallback list")
             new_agents = config.FALLBACK_USER_AGENTS
+            weights = config.FALLBACK_USER_AGENT_WEIGHTS
+            if len(weights) == len(new_agents):
+                self._ua_cum_weights = tuple(accumulate(weights[:config.USER_AGENT_CACHE_SIZE]))
+            else:
+                # random.choices would raise on every request; pick uniformly instead
+                self.logger.warning("FALLBACK_USER_AGENT_WEIGHTS doesn't match FALLBACK_USER_AGENTS, ignoring weights")
         
         self.user_agent_list = new_agents[:config.USER_AGENT_CACHE_SIZE]
+        self._ua_bytes = [ua.encode('utf-8') for ua in self.user_agent_list]
         self.last_refresh = current_time
+        self._ua_cycle = iter(())  # Start a fresh shuffled pass over the new list
         
         self.logger.info(f"Refreshed user agents: {len(self.user_agent_list)} agents loaded using '{self.strategy}' strategy")
 
@@ -132,7 +181,7 @@ class DynamicUserAgentMiddleware(UserAgentMiddleware):
             params = config.SCRAPEOPS_USER_AGENT_PARAMS.copy()
             params['api_key'] = config.SCRAPEOPS_API_KEY
             
-            response = requests.get(
+            response = _SESSION.get(
                 config.SCRAPEOPS_USER_AGENT_ENDPOINT,
                 params=params,
                 timeout=10
@@ -162,20 +211,21 @@ class DynamicUserAgentMiddleware(UserAgentMiddleware):
             
             # Generate multiple user agents
             agents = []
+            seen = set()
             browsers = ['chrome', 'firefox', 'safari', 'edge']
             
-            for _ in range(config.USER_AGENT_CACHE_SIZE):
-                for browser in browsers:
-                    try:
-                        agent = getattr(ua, browser)
-                        if agent not in agents:
-                            agents.append(agent)
-                        if len(agents) >= config.USER_AGENT_CACHE_SIZE:
-                            break
-                    except:
-                        continue
-                if len(agents) >= config.USER_AGENT_CACHE_SIZE:
-                    break
+            # Cap attempts so repeated duplicates can't loop forever
+            max_attempts = config.USER_AGENT_CACHE_SIZE * 10
+            attempts = 0
+            while len(agents) < config.USER_AGENT_CACHE_SIZE and attempts < max_attempts:
+                attempts += 1
+                try:
+                    agent = getattr(ua, random.choice(browsers))
+                except Exception:
+                    continue
+                if agent not in seen:
+                    seen.add(agent)
+                    agents.append(agent)
             
             if agents:
                 self.logger.info(f"Generated {len(agents)} user agents using fake-useragent")
@@ -188,17 +238,30 @@ class DynamicUserAgentMiddleware(UserAgentMiddleware):
         
         return []
 
+    def _refill_ua_cycle(self):
+        """Start a new pass over the user agents in random order"""
+        shuffled = list(self._ua_bytes)
+        random.shuffle(shuffled)
+        self._ua_cycle = iter(shuffled)
+
     def process_request(self, request, spider):
-        # Refresh user agents if needed
-        self.refresh_user_agents()
+        if self._ua_cum_weights:
+            # Weighted pick from the fallback list
+            ua = random.choices(self._ua_bytes, cum_weights=self._ua_cum_weights, k=1)[0]
+        elif self._ua_bytes:
+            # Select next user agent from the shuffled cycle
+            ua = next(self._ua_cycle, None)
+            if ua is None:
+                self._refill_ua_cycle()
+                ua = next(self._ua_cycle)
+        else:
+            ua = None
         
-        # Select random user agent
-        if self.user_agent_list:
-            ua = random.choice(self.user_agent_list)
+        if ua is not None:
             request.headers['User-Agent'] = ua
             
-            if config.LOG_USER_AGENT_ROTATION:
-                spider.logger.debug(f"Using User-Agent: {ua[:50]}...")
+            if config.LOG_USER_AGENT_ROTATION and spider.logger.isEnabledFor(logging.DEBUG):
+                spider.logger.debug("Using User-Agent: %.50s...", ua.decode('utf-8'))
         else:
             spider.logger.error("No user agents available!")
         
@@ -2,11 +2,76 @@
 
 import json
 import logging
-from datetime import datetime
+import sys
+import time
 from itemadapter import ItemAdapter
 from amazon_scraper.database import get_db_manager
+from amazon_scraper.items import AmazonProductItem
 import config
 from scrapy.exceptions import DropItem
+from twisted.internet import defer, task, threads
+from twisted.python.failure import Failure
+
+try:
+    import orjson  # Optional: much faster item serialization
+except ImportError:
+    orjson = None
+
+
+def dumps_item(data: dict) -> bytes:
+    """Serialize an item dict to UTF-8 JSON, using orjson when installed"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+# Optional fields reset to None when missing or empty
+DEFAULT_NONE_FIELDS = frozenset({
+    'SalesSubRank',
+    'SalesSubSubRank',
+    'ShippingCost',
+    'SellerOffersCount',
+    'DispatchesFrom',
+    'IsBuyBoxWinner',
+    'CustomerServiceProvider',
+    'ListingDate',
+    'DeliveryEstimateFastest',
+    'DeliveryEstimateSlowest',
+    'DeliveryDaysSlowest',
+    'DeliveryDays',
+})
+
+# The spider already yields floats/ints, so converters return those unchanged
+# before falling back to parsing
+def _to_float(value):
+    if type(value) is float:
+        return value
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+def _to_int(value):
+    if type(value) is int:
+        return value
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+def _to_star_rating(value):
+    rating = _to_float(value)
+    if rating is not None and 0 <= rating <= 5:
+        return rating
+    return None
+
+# (field, converter) pairs applied by AmazonScraperPipeline.clean_item_data
+ITEM_CLEANERS = (
+    ('Title', str.strip),
+    ('Price', _to_float),
+    ('StarRating', _to_star_rating),
+    ('NumberOfRatings', _to_int),
+    ('Brand', str.strip),
+)
 
 class AmazonScraperPipeline:
     """Pipeline for processing Amazon product items"""
@@ -25,8 +90,10 @@ class AmazonScraperPipeline:
         
     def process_item(self, item, spider):
         """Process each item"""
-        adapter = ItemAdapter(item)
-        
+        return self.process_adapter(item, ItemAdapter(item), spider)
+    
+    def process_adapter(self, item, adapter, spider):
+        """Process an item through an existing adapter"""
         # Validate required fields
         if not adapter.get('ASIN'):
             spider.logger.warning(f"Item dropped - missing ASIN: {adapter.get('Title', 'Unknown')}")
@@ -38,50 +105,19 @@ class AmazonScraperPipeline:
         
         # Log successful processing
         self.items_processed += 1
-        spider.logger.info(f"Processed item: {adapter.get('Title', 'Unknown')} (ASIN: {adapter.get('ASIN')})")
+        if spider.logger.isEnabledFor(logging.DEBUG):
+            spider.logger.debug("Processed item: %s (ASIN: %s)", adapter.get('Title', 'Unknown'), adapter.get('ASIN'))
         
         return item
     
     def clean_item_data(self, adapter, spider):
         """Clean and validate item data"""
         
-        # Clean title
-        title = adapter.get('Title')
-        if title:
-            adapter['Title'] = title.strip()
-        
-        # Clean price
-        price = adapter.get('Price')
-        if price:
-            try:
-                adapter['Price'] = float(price)
-            except (ValueError, TypeError):
-                adapter['Price'] = None
-        
-        # Clean star rating
-        star_rating = adapter.get('StarRating')
-        if star_rating:
-            try:
-                rating = float(star_rating)
-                if 0 <= rating <= 5:
-                    adapter['StarRating'] = rating
-                else:
-                    adapter['StarRating'] = None
-            except (ValueError, TypeError):
-                adapter['StarRating'] = None
-        
-        # Clean number of ratings
-        num_ratings = adapter.get('NumberOfRatings')
-        if num_ratings:
-            try:
-                adapter['NumberOfRatings'] = int(num_ratings)
-            except (ValueError, TypeError):
-                adapter['NumberOfRatings'] = None
-        
-        # Clean brand
-        brand = adapter.get('Brand')
-        if brand:
-            adapter['Brand'] = brand.strip()
+        # Clean non-empty fields with their converter (invalid values become None)
+        for field, clean in ITEM_CLEANERS:
+            value = adapter.get(field)
+            if value:
+                adapter[field] = clean(value)
         
         # Set default values for missing fields
         self.set_default_values(adapter)
@@ -89,27 +125,18 @@ class AmazonScraperPipeline:
     def set_default_values(self, adapter):
         """Set default values for missing fields"""
         
-        # Set default values
-        defaults = {
-            'SalesSubRank': None,
-            'SalesSubSubRank': None,
-            'ShippingCost': None,
-            'SellerOffersCount': None,
-            'DispatchesFrom': None,
-            'IsBuyBoxWinner': None,
-            'CustomerServiceProvider': None,
-            'ListingDate': None,
-            'DeliveryEstimateFastest': None,
-            'DeliveryEstimateSlowest': None,
-            'DeliveryDaysSlowest': None,
-            'FastestDeliveryDate': None,
-            'SlowestDeliveryDate': None,
-            'DeliveryDays': None,
-        }
-        
-        for field, default_value in defaults.items():
+        # Every default is None, so only the field names are needed
+        item = adapter.item
+        if isinstance(item, AmazonProductItem):
+            # Every field exists on the dataclass; skip the adapter's per-call dispatch
+            for field in DEFAULT_NONE_FIELDS:
+                if not getattr(item, field):
+                    setattr(item, field, None)
+            return
+        
+        for field in DEFAULT_NONE_FIELDS:
             if not adapter.get(field):
-                adapter[field] = default_value
+                adapter[field] = None
 
 
 class DuplicatesPipeline:
@@ -123,14 +150,19 @@ class DuplicatesPipeline:
         if item is None:
             spider.logger.warning("DuplicatesPipeline received None item")
             raise DropItem("Item is None")
-            
-        adapter = ItemAdapter(item)
+        
+        return self.process_adapter(item, ItemAdapter(item), spider)
+    
+    def process_adapter(self, item, adapter, spider):
+        """Filter an item through an existing adapter"""
         asin = adapter.get('ASIN')
         
         if not asin:
             spider.logger.warning("Item missing ASIN, skipping duplicate check")
             return item
         
+        # Interned so the set keeps one shared copy of each ASIN string
+        asin = sys.intern(asin)
         if asin in self.asins_seen:
             spider.logger.info(f"Duplicate item found: {asin}")
             raise DropItem(f"Duplicate item: {asin}")
@@ -139,26 +171,42 @@ class DuplicatesPipeline:
             return item
         
 class JsonWriterPipeline:
-    """Pipeline to write items to JSON file"""
+    """Pipeline to write items to a JSON Lines file, or a JSON array when 'jl' isn't configured"""
     
     def __init__(self):
         self.file = None
-        self.items = []
+        self.items_written = 0
+        self.json_lines = 'jl' in config.OUTPUT_FORMATS
         
     def open_spider(self, spider):
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"amazon_products_{timestamp}.json"
-        self.file = open(filename, 'w', encoding='utf-8')
+        extension = 'jl' if self.json_lines else 'json'
+        filename = f"amazon_products_{time.strftime('%Y%m%d_%H%M%S')}.{extension}"
+        # Items are streamed to disk as they arrive instead of held in memory
+        self.file = open(filename, 'wb', buffering=1 << 20)
+        if not self.json_lines:
+            self.file.write(b'[')
         spider.logger.info(f"Opened JSON file: {filename}")
         
     def close_spider(self, spider):
-        # Write all items to file
-        json.dump(self.items, self.file, indent=2, ensure_ascii=False)
+        if not self.json_lines:
+            self.file.write(b'\n]' if self.items_written else b']')
         self.file.close()
-        spider.logger.info(f"Closed JSON file with {len(self.items)} items")
+        spider.logger.info(f"Closed JSON file with {self.items_written} items")
         
     def process_item(self, item, spider):
-        self.items.append(ItemAdapter(item).asdict())
+        return self.process_adapter(item, ItemAdapter(item), spider)
+    
+    def process_adapter(self, item, adapter, spider):
+        """Write an item through an existing adapter"""
+        if self.json_lines:
+            self.file.write(dumps_item(adapter.asdict()))
+            self.file.write(b'\n')
+        else:
+            if self.items_written:
+                self.file.write(b',')
+            self.file.write(b'\n')
+            self.file.write(dumps_item(adapter.asdict()))
+        self.items_written += 1
         return item
 
 
@@ -167,6 +215,14 @@ class ValidationPipeline:
     
     def __init__(self):
         self.validation_errors = 0
+        # Validation bounds from config, read once instead of per item
+        self.min_price = config.MIN_PRICE
+        self.max_price = config.MAX_PRICE
+        self.min_star_rating = config.MIN_STAR_RATING
+        self.max_star_rating = config.MAX_STAR_RATING
+        self.min_num_ratings = config.MIN_NUM_RATINGS
+        self.max_title_length = config.MAX_TITLE_LENGTH
+        self.filter_invalid_prices = config.FILTER_INVALID_PRICES
         
     def open_spider(self, spider):
         self.validation_errors = 0
@@ -181,7 +237,10 @@ class ValidationPipeline:
             spider.logger.error("ValidationPipeline received None item - this shouldn't happen")
             raise DropItem("ValidationPipeline received None item")
         
-        adapter = ItemAdapter(item)
+        return self.process_adapter(item, ItemAdapter(item), spider)
+    
+    def process_adapter(self, item, adapter, spider):
+        """Validate an item through an existing adapter"""
         asin = adapter.get('ASIN')
         
         # Validate ASIN format
@@ -191,33 +250,33 @@ class ValidationPipeline:
         
         # Validate price using config
         price = adapter.get('Price')
-        if price:
-            if price < config.MIN_PRICE or price > config.MAX_PRICE:
-                spider.logger.warning(f"Suspicious price: {price} for ASIN: {asin}")
-                self.validation_errors += 1
+        if price and not (self.min_price <= price <= self.max_price):
+            spider.logger.warning(f"Suspicious price: {price} for ASIN: {asin}")
+            self.validation_errors += 1
+            
+            # Filter invalid products if configured
+            if self.filter_invalid_prices:
+                raise DropItem(f"Invalid price {price} for ASIN: {asin}")
         
         # Validate star rating using config
         star_rating = adapter.get('StarRating')
-        if star_rating:
-            if star_rating < config.MIN_STAR_RATING or star_rating > config.MAX_STAR_RATING:
-                spider.logger.warning(f"Invalid star rating: {star_rating} for ASIN: {asin}")
-                self.validation_errors += 1
+        if star_rating and not (self.min_star_rating <= star_rating <= self.max_star_rating):
+            spider.logger.warning(f"Invalid star rating: {star_rating} for ASIN: {asin}")
+            self.validation_errors += 1
         
         # Validate number of ratings using config
         num_ratings = adapter.get('NumberOfRatings')
-        if num_ratings and num_ratings < config.MIN_NUM_RATINGS:
+        if num_ratings and num_ratings < self.min_num_ratings:
             spider.logger.warning(f"Invalid number of ratings: {num_ratings} for ASIN: {asin}")
             self.validation_errors += 1
         
         # Validate title length
         title = adapter.get('Title')
-        if title and len(title) > config.MAX_TITLE_LENGTH:
-            spider.logger.warning(f"Title too long ({len(title)} chars) for ASIN: {asin}")
-            self.validation_errors += 1
-        
-        # Filter invalid products if configured
-        if config.FILTER_INVALID_PRICES and price and (price < config.MIN_PRICE or price > config.MAX_PRICE):
-            raise DropItem(f"Invalid price {price} for ASIN: {asin}")
+        if title:
+            title_length = len(title)
+            if title_length > self.max_title_length:
+                spider.logger.warning(f"Title too long ({title_length} chars) for ASIN: {asin}")
+                self.validation_errors += 1
         
         return item
     
@@ -230,25 +289,40 @@ class MongoDBPipeline:
         self.logger = logging.getLogger(__name__)
         self.products_buffer = []
         self.buffer_size = config.MONGODB_BATCH_SIZE
+        self.async_writes = config.ENABLE_ASYNC_DB_OPERATIONS
+        self.pending_writes = set()  # Deferreds of batches being written in background threads
+        self.write_limiter = defer.DeferredSemaphore(config.MONGODB_MAX_CONCURRENT_WRITES)
+        self._flush_loop = None  # Flushes a part-filled buffer when items arrive slowly
         
     def open_spider(self, spider):
         """Initialize database connection when spider opens"""
         if config.MONGODB_ENABLED:
             self.db_manager = get_db_manager()
+            self._flush_loop = task.LoopingCall(self._flush_buffer)
+            self._flush_loop.start(config.MONGODB_FLUSH_INTERVAL, now=False)
             self.logger.info("MongoDB pipeline initialized")
         else:
             self.logger.info("MongoDB pipeline disabled")
     
     def close_spider(self, spider):
         """Flush remaining items and close connection when spider closes"""
-        if self.db_manager and self.products_buffer:
-            # Insert remaining items in buffer
-            self._flush_buffer()
+        if not self.db_manager:
+            return None
+        
+        if self._flush_loop and self._flush_loop.running:
+            self._flush_loop.stop()
         
-        # Print statistics
-        if self.db_manager:
+        # Insert remaining items in buffer
+        self._flush_buffer()
+        
+        # Print statistics once every background write has finished
+        def log_stats(_):
             stats = self.db_manager.get_scraping_stats()
             spider.logger.info(f"Scraping completed. Database stats: {stats}")
+        
+        d = defer.DeferredList(list(self.pending_writes))
+        d.addCallback(log_stats)
+        return d
     
     def process_item(self, item, spider):
         """Process each scraped item"""
@@ -256,18 +330,14 @@ class MongoDBPipeline:
             return item
         
         try:
-            # Convert item to dict
-            product_data = dict(item)
-            
-            # Check for duplicates before processing
-            asin = product_data.get('ASIN')
-            domain = product_data.get('Domain', 'us')
-            
-            if asin and self.db_manager.is_product_scraped(asin, domain):
-                spider.logger.debug(f"Skipping duplicate product: {asin}")
-                return item
+            # Convert item to dict; other item types go through ItemAdapter
+            if isinstance(item, AmazonProductItem):
+                product_data = item.to_dict()
+            else:
+                product_data = ItemAdapter(item).asdict()
             
-            # Add to buffer for batch processing
+            # Add to buffer for batch processing; duplicates are resolved by the
+            # bulk upsert against the unique (ASIN, domain) index when flushing
             self.products_buffer.append(product_data)
             
             # Flush buffer when it reaches batch size
@@ -285,13 +355,36 @@ class MongoDBPipeline:
         if not self.products_buffer:
             return
         
+        batch = list(self.products_buffer)
+        self.products_buffer.clear()  # Clear buffer, reusing the list's storage
+        
+        if self.async_writes:
+            # Write from the reactor's thread pool so crawling continues during the round-trip;
+            # the semaphore queues extra batches so slow writes cannot take every pooled socket
+            d = self.write_limiter.run(threads.deferToThread, self._write_batch, batch)
+            self.pending_writes.add(d)
+            d.addBoth(self._write_finished, d)
+        else:
+            self._write_batch(batch)
+    
+    def _write_batch(self, batch):
+        """Bulk write one batch of products"""
         try:
-            inserted_count = self.db_manager.bulk_insert_products(self.products_buffer)
+            inserted_count = self.db_manager.bulk_insert_products(batch)
             self.logger.info(f"Inserted {inserted_count} products to MongoDB")
-            self.products_buffer = []  # Clear buffer
             
         except Exception as e:
             self.logger.error(f"Error flushing products buffer: {e}")
+    
+    def _write_finished(self, result, d):
+        self.pending_writes.discard(d)
+        if isinstance(result, Failure):
+            self.logger.error(f"Error flushing products buffer: {result.getErrorMessage()}")
+
+
+def _pack_asin_key(asin: str, domain: str) -> int:
+    """Pack an (ASIN, domain) pair into one int, so the seen set holds no strings or tuples"""
+    return int.from_bytes(f"{asin}|{domain}".encode('utf-8'), 'little')
 
 
 class DatabaseDuplicatesPipeline:
@@ -301,7 +394,7 @@ class DatabaseDuplicatesPipeline:
         self.db_manager = None
         self.logger = logging.getLogger(__name__)
         self.filtered_count = 0
-        self.memory_asins = set()  # Fallback to memory if DB disabled
+        self.memory_asins = set()  # Packed (ASIN, domain) keys seen this run, checked before the database
     
     def open_spider(self, spider):
         if config.MONGODB_ENABLED and config.PREVENT_DUPLICATE_PRODUCTS:
@@ -320,8 +413,11 @@ class DatabaseDuplicatesPipeline:
             spider.logger.error("DatabaseDuplicatesPipeline received None item")
             raise DropItem("DatabaseDuplicatesPipeline received None item")
         
+        return self.process_adapter(item, ItemAdapter(item), spider)
+    
+    def process_adapter(self, item, adapter, spider):
+        """Filter an item through an existing adapter"""
         try:
-            adapter = ItemAdapter(item)
             asin = adapter.get('ASIN')
             domain = adapter.get('Domain', 'us')
             
@@ -329,21 +425,19 @@ class DatabaseDuplicatesPipeline:
                 spider.logger.warning("Item missing ASIN in DatabaseDuplicatesPipeline")
                 return item
             
-            # Check duplicates using database if enabled
-            if self.db_manager:
-                if self.db_manager.is_product_scraped(asin, domain):
-                    self.filtered_count += 1
-                    spider.logger.debug(f"Dropping duplicate product from DB: {asin}")
-                    raise DropItem(f"Duplicate product in database: {asin}")
-            else:
-                # Fallback to memory-based duplicate checking
-                asin_key = f"{asin}_{domain}"
-                if asin_key in self.memory_asins:
-                    self.filtered_count += 1
-                    spider.logger.debug(f"Dropping duplicate product from memory: {asin}")
-                    raise DropItem(f"Duplicate product in memory: {asin}")
-                else:
-                    self.memory_asins.add(asin_key)
+            # Duplicates within this run are caught in memory (add, then see if the set grew)
+            seen_count = len(self.memory_asins)
+            self.memory_asins.add(_pack_asin_key(asin, domain))
+            if len(self.memory_asins) == seen_count:
+                self.filtered_count += 1
+                spider.logger.debug("Dropping duplicate product from memory: %s", asin)
+                raise DropItem(f"Duplicate product in memory: {asin}")
+            
+            # Check products from earlier runs using database if enabled
+            if self.db_manager and self.db_manager.is_product_scraped(asin, domain):
+                self.filtered_count += 1
+                spider.logger.debug("Dropping duplicate product from DB: %s", asin)
+                raise DropItem(f"Duplicate product in database: {asin}")
             
             # ✅ CRITICAL: Always return the item if not dropped
             return item
@@ -354,4 +448,53 @@ class DatabaseDuplicatesPipeline:
         except Exception as e:
             # Log any unexpected errors but don't return None
             spider.logger.error(f"Error in DatabaseDuplicatesPipeline: {e}")
-            return item  # ✅ Return item even if there's an error
\ No newline at end of file
+            return item  # ✅ Return item even if there's an error
+
+
+class FusedAmazonPipeline:
+    """Runs every Amazon pipeline stage in one pass with a single ItemAdapter per item"""
+    
+    def __init__(self):
+        self.validation = ValidationPipeline()
+        self.database_duplicates = DatabaseDuplicatesPipeline()
+        self.processing = AmazonScraperPipeline()
+        self.mongodb = MongoDBPipeline()
+        self.json_writer = JsonWriterPipeline()
+        # Same order the standalone pipelines run in ITEM_PIPELINES
+        self.stages = (
+            self.validation,
+            self.database_duplicates,
+            self.processing,
+            self.mongodb,
+            self.json_writer,
+        )
+    
+    def open_spider(self, spider):
+        for stage in self.stages:
+            if hasattr(stage, 'open_spider'):
+                stage.open_spider(spider)
+    
+    def close_spider(self, spider):
+        # Stages may return a Deferred (MongoDB waits for background writes)
+        pending = []
+        for stage in self.stages:
+            if hasattr(stage, 'close_spider'):
+                result = stage.close_spider(spider)
+                if isinstance(result, defer.Deferred):
+                    pending.append(result)
+        if pending:
+            return defer.DeferredList(pending)
+        return None
+    
+    def process_item(self, item, spider):
+        if item is None:
+            spider.logger.error("FusedAmazonPipeline received None item")
+            raise DropItem("FusedAmazonPipeline received None item")
+        
+        adapter = ItemAdapter(item)
+        self.validation.process_adapter(item, adapter, spider)
+        self.database_duplicates.process_adapter(item, adapter, spider)
+        self.processing.process_adapter(item, adapter, spider)
+        self.mongodb.process_item(item, spider)  # Buffers a dict copy of the item
+        self.json_writer.process_adapter(item, adapter, spider)
+        return item
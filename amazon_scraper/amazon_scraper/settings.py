@@ -16,10 +16,15 @@ ROBOTSTXT_OBEY = False
 
 # Concurrency and throttling settings
 CONCURRENT_REQUESTS = config.CONCURRENT_REQUESTS
-CONCURRENT_REQUESTS_PER_DOMAIN = config.CONCURRENT_REQUESTS
+CONCURRENT_REQUESTS_PER_DOMAIN = config.CONCURRENT_REQUESTS_PER_DOMAIN
 DOWNLOAD_DELAY = config.DELAY_BETWEEN_REQUESTS
 RANDOMIZE_DOWNLOAD_DELAY = True
 
+# Schedule by downloader slot load so the single Amazon slot stays busy
+SCHEDULER_PRIORITY_QUEUE = 'scrapy.pqueues.DownloaderAwarePriorityQueue'
+# Persist the scheduler queue to disk when configured
+JOBDIR = config.JOBDIR
+
 
 # Disable cookies (enabled by default)
 #COOKIES_ENABLED = False
@@ -67,53 +72,61 @@ EXTENSIONS = {
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
+# FusedAmazonPipeline runs, in one pass, the same stages as:
+#    "amazon_scraper.pipelines.ValidationPipeline": 100,           # Validate first
+#    "amazon_scraper.pipelines.DatabaseDuplicatesPipeline": 200,   # Filter memory + DB duplicates
+#    "amazon_scraper.pipelines.AmazonScraperPipeline": 300,        # Your existing processing
+#    "amazon_scraper.pipelines.MongoDBPipeline": 400,              # Store in MongoDB
+#    "amazon_scraper.pipelines.JsonWriterPipeline": 500,           # Output to JSON
 ITEM_PIPELINES = {
-    "amazon_scraper.pipelines.ValidationPipeline": 100,           # Validate first
-    "amazon_scraper.pipelines.DatabaseDuplicatesPipeline": 200,   # Filter DB duplicates  
-    "amazon_scraper.pipelines.DuplicatesPipeline": 250,           # Memory duplicate backup
-    "amazon_scraper.pipelines.AmazonScraperPipeline": 300,        # Your existing processing
-    "amazon_scraper.pipelines.MongoDBPipeline": 400,              # Store in MongoDB
-    "amazon_scraper.pipelines.JsonWriterPipeline": 500,           # Output to JSON
+    "amazon_scraper.pipelines.FusedAmazonPipeline": 100,
 }
 
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
-AUTOTHROTTLE_ENABLED = True
+AUTOTHROTTLE_ENABLED = config.AUTOTHROTTLE_ENABLED
 # The initial download delay
-AUTOTHROTTLE_START_DELAY = config.DELAY_BETWEEN_REQUESTS
+AUTOTHROTTLE_START_DELAY = config.AUTOTHROTTLE_START_DELAY
 # The maximum download delay to be set in case of high latencies
-AUTOTHROTTLE_MAX_DELAY = 60
+AUTOTHROTTLE_MAX_DELAY = config.AUTOTHROTTLE_MAX_DELAY
 # The average number of requests Scrapy should be sending in parallel to
 # each remote server
-AUTOTHROTTLE_TARGET_CONCURRENCY = 1.0
+AUTOTHROTTLE_TARGET_CONCURRENCY = config.AUTOTHROTTLE_TARGET_CONCURRENCY
 # Enable showing throttling stats for every response received:
-AUTOTHROTTLE_DEBUG = True
+AUTOTHROTTLE_DEBUG = config.AUTOTHROTTLE_DEBUG
 
 # Enable and configure HTTP caching (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html#httpcache-middleware-settings
 HTTPCACHE_ENABLED = config.ENABLE_CACHE
-HTTPCACHE_EXPIRATION_SECS = config.CACHE_EXPIRATION_HOURS * 3600
-#HTTPCACHE_DIR = "httpcache"
-#HTTPCACHE_IGNORE_HTTP_CODES = []
-#HTTPCACHE_STORAGE = "scrapy.extensions.httpcache.FilesystemCacheStorage"
+HTTPCACHE_EXPIRATION_SECS = config.CACHE_EXPIRATION_SECS
+HTTPCACHE_DIR = config.CACHE_DIR
+HTTPCACHE_IGNORE_HTTP_CODES = config.CACHE_IGNORE_HTTP_CODES
+HTTPCACHE_POLICY = config.CACHE_POLICY
+HTTPCACHE_ALWAYS_STORE = config.CACHE_ALWAYS_STORE
+HTTPCACHE_IGNORE_RESPONSE_CACHE_CONTROLS = config.CACHE_IGNORE_RESPONSE_CACHE_CONTROLS
+HTTPCACHE_STORAGE = config.CACHE_STORAGE
 
 # Set settings whose default value is deprecated to a future-proof value
 FEED_EXPORT_ENCODING = "utf-8"
+# Fixed column order for the CSV feed, so exporters don't derive it from the first item
+FEED_EXPORT_FIELDS = config.FEED_EXPORT_FIELDS
+# JSON feeds (e.g. run_scraper.py -o out.json / out.jl) are encoded with orjson when installed
+FEED_EXPORTERS = {
+    'json': 'amazon_scraper.exporters.OrjsonItemExporter',
+    'jsonlines': 'amazon_scraper.exporters.OrjsonLinesItemExporter',
+    'jl': 'amazon_scraper.exporters.OrjsonLinesItemExporter',
+}
 
 # Logging configuration from config
 LOG_LEVEL = config.LOG_LEVEL
-LOG_FILE = config.LOG_FILE
+LOG_FILE = config.get_log_filename()  # Switched to the next day's file at midnight by the spider
 
-# Configure feed exports
+# Configure feed exports (JSON output is written by JsonWriterPipeline)
 FEEDS = {
     f'{config.OUTPUT_FILENAME_PREFIX}.csv': {
         'format': 'csv',
         'overwrite': True,
     },
-    f'{config.OUTPUT_FILENAME_PREFIX}.json': {
-        'format': 'json',
-        'overwrite': True,
-    },
 }
 
 # ScrapeOps Monitoring
@@ -1,14 +1,230 @@
 
 import scrapy
-import json
+import logging
+import os
 import re
+import time
 import config
+from logging.handlers import TimedRotatingFileHandler
+from scrapy import signals
+from collections import Counter
+from lxml import etree
+from parsel.csstranslator import css2xpath
+from twisted.internet import task
 from datetime import datetime, timedelta
-from urllib.parse import urljoin, urlparse, parse_qs
+from urllib.parse import urljoin, urlparse, parse_qs, quote_plus
 from amazon_scraper.items import AmazonProductItem
 from amazon_scraper.database import get_db_manager
 from amazon_scraper.keyword_generator import get_keyword_generator
 
+# Precompiled patterns used by the extract_* methods
+ASIN_URL_PATTERN = re.compile(r'/dp/([A-Z0-9]{10})')
+STAR_RATING_PATTERN = re.compile(r'(\d+\.?\d*)\s*out\s*of\s*5')
+RATING_COUNT_PATTERN = re.compile(r'([\d,]+)')
+PRICE_PATTERN = re.compile(r'(\d+\.?\d*)')
+SHIPPING_COST_PATTERN = re.compile(r'£(\d+\.?\d*)')
+INTEGER_PATTERN = re.compile(r'(\d+)')
+BEST_SELLER_RANK_TEXT_PATTERN = re.compile(r'Best Sellers Rank:?\s*(\d+)\s+in')
+RANK_CATEGORY_PATTERN = re.compile(r'\d+\s+in\s+(.+)')
+DELIVERY_DATE_PATTERN = re.compile(r'(\w+day,\s+\d+\s+\w+)')
+BUYBOX_DELIVERY_PATTERN = re.compile(r'(?:delivery|arrives|get it)\s+(\w+day,?\s+\d+\s+\w+)', re.IGNORECASE)
+WEEKDAY_PATTERN = re.compile(r'(\w+day)')
+WEEKDAY_INDEX = {
+    'Monday': 0, 'Tuesday': 1, 'Wednesday': 2, 'Thursday': 3,
+    'Friday': 4, 'Saturday': 5, 'Sunday': 6
+}  # Same numbering as datetime.weekday()
+# Based on shell testing: "Sold by: AnkerDirect UK", "Dispatches from: Amazon"
+# One alternation per field: the labelled form ("Sold by:") or the plain one ("Sold by")
+SOLD_BY_PATTERN = re.compile(
+    r'Sold by:\s*(?P<labelled>[^,\n]+?)(?:\s*Dispatches|\s*Returns|\s*[\n\r]|\s*$)'
+    r'|Sold by\s+(?P<plain>[A-Za-z\s&\-\.]+?)(?:\s{2,}|\s*Returns|\s*$)',
+    re.IGNORECASE
+)
+DISPATCH_PATTERN = re.compile(
+    r'Dispatches from:\s*(?P<labelled>[^,\n]+?)(?:\s*Sold by|\s*Returns|\s*[\n\r]|\s*$)'
+    r'|Dispatches from\s+(?P<plain>[A-Za-z\s&\-\.]+?)(?:\s{2,}|\s*Sold by|\s*$)',
+    re.IGNORECASE
+)
+
+
+def compile_css(selector, as_boolean=False):
+    """Translate a CSS selector (with parsel's ::text) to XPath and compile it once"""
+    xpath = css2xpath(selector)
+    if as_boolean:
+        return etree.XPath(f'boolean({xpath})')
+    return etree.XPath(xpath, smart_strings=False)
+
+
+def compile_selectors(*selectors):
+    """Compile a priority list of selectors; entries starting with '/' are XPath, the rest CSS"""
+    return tuple(
+        etree.XPath(selector, smart_strings=False) if selector.startswith('/') else compile_css(selector)
+        for selector in selectors
+    )
+
+
+# Per-field selectors, tried in priority order: a union would return nodes in document
+# order and let generic fallbacks (e.g. `.a-offscreen`) win over the specific ids.
+# `:contains()` lookups are written as XPath. All are compiled at import and evaluated
+# directly on the response's lxml root.
+TITLE_SELECTORS = compile_selectors('#productTitle::text', '.product-title::text', 'h1 span::text', 'h1::text')
+BRAND_SELECTORS = compile_selectors(
+    '#bylineInfo::text',
+    '#bylineInfo a::text',
+    '.a-offscreen::text',
+    '//tr[contains(., "Brand")]//td/text()',
+    '//tr[contains(., "Manufacturer")]//td/text()',
+    '//span[contains(., "Brand")]/text()',
+    '//span[contains(., "by")]//a/text()'
+)
+STAR_RATING_SELECTORS = compile_selectors(
+    '[data-hook="average-star-rating"] .a-icon-alt::text',
+    '.a-icon-alt::text',
+    '[data-hook="rating-out-of-text"]::text',
+    '//span[contains(., "out of 5")]/text()',
+    '.cr-widget-FocusReviews .a-icon-alt::text'
+)
+RATING_COUNT_SELECTORS = compile_selectors(
+    '[data-hook="total-review-count"]::text',
+    '#acrCustomerReviewText::text',
+    'span[data-hook="total-review-count"]::text',
+    '//a[contains(., "ratings")]/text()',
+    '//span[contains(., "ratings")]/text()'
+)
+PRICE_SELECTORS = compile_selectors(
+    '.a-price-whole::text',
+    '.a-price.a-text-price.a-size-medium.apexPriceToPay .a-offscreen::text',
+    '.a-price .a-offscreen::text',
+    '#priceblock_ourprice::text',
+    '#priceblock_dealprice::text',
+    '.a-price-range .a-price .a-offscreen::text',
+    'span.a-price-symbol + span.a-price-whole::text'
+)
+BEST_SELLER_RANK_FALLBACK_SELECTORS = compile_selectors(
+    '//*[@id="productDetails_detailBullets_sections1"]//tr[contains(., "Best Sellers Rank")]//td/text()',
+    '//*[@id="productDetails_db_sections"]//tr[contains(., "Best Sellers Rank")]//td/text()',
+    '//tr[contains(., "Best Sellers Rank")]//td/text()'
+)
+SELLER_SELECTORS = compile_selectors(
+    '#merchant-info a::text',
+    '#soldByThirdParty a::text',
+    '//span[contains(., "Sold by")]/text()'
+)
+PRIME_BADGE_SELECTOR = compile_css('i.a-icon-prime, [aria-label*="Prime"]', as_boolean=True)
+# Checked in order; the first selector with text decides
+AVAILABILITY_SELECTORS = tuple(compile_css(selector) for selector in (
+    '#availability span::text',
+    '#availability::text',
+    '#availability-brief::text'
+))
+QUANTITY_INPUT_SELECTOR = compile_css('select[name="quantity"], #quantity', as_boolean=True)
+NEXT_PAGE_SELECTOR = compile_css(
+    '.s-pagination-next:not(.s-pagination-disabled), '
+    'a[aria-label="Go to next page"], '
+    '.a-pagination .a-last:not(.a-disabled)',
+    as_boolean=True
+)
+
+# Search results are walked on the raw lxml tree with XPath compiled once at import
+SEARCH_RESULT_ITEMS_XPATH = etree.XPath(
+    '//*[contains(concat(" ", normalize-space(@class), " "), " s-result-item ") and @data-asin != ""]'
+)
+SPONSORED_XPATH = etree.XPath('contains(string(.), "Sponsored")')
+PRODUCT_LINK_XPATH = etree.XPath('(.//a[contains(@href, "/dp/")])[1]/@href')
+
+# Product page sections read by several extractors, located together in one document pass
+PRODUCT_SECTION_IDS = (
+    'buybox',
+    'apex_desktop',
+    'mir-layout-DELIVERY_BLOCK',
+    'contextualIngressPt',
+    'detailBulletsWrapper_feature_div',
+    'productDetails_detailBullets_sections1',
+)
+PRODUCT_SECTIONS_XPATH = etree.XPath(
+    '//*[' + ' or '.join(f'@id="{section_id}"' for section_id in PRODUCT_SECTION_IDS) + ']'
+)
+# Relative to a section node; same text nodes as the old '#id *::text' selectors
+SECTION_TEXT_XPATH = etree.XPath('.//*/text()', smart_strings=False)
+BEST_SELLER_RANK_XPATH = etree.XPath(
+    './/tr[contains(., "Best Sellers Rank")]//td//span//li//span//span/text()', smart_strings=False
+)
+LISTING_DATE_XPATH = etree.XPath('.//tr[contains(., "Date First Available")]//td/text()', smart_strings=False)
+
+
+def index_sections(root):
+    """Map each product section id to its (first) element"""
+    sections = {}
+    for element in PRODUCT_SECTIONS_XPATH(root):
+        sections.setdefault(element.get('id'), element)
+    return sections
+
+
+def section_text(sections, section_id):
+    """Joined text of a section's descendants, or '' when the page lacks it"""
+    element = sections.get(section_id)
+    if element is None:
+        return ''
+    return ' '.join(SECTION_TEXT_XPATH(element))
+
+
+def parse_price(price_text):
+    """Parse a price like '£1,299.99'; plain numbers skip the regex entirely"""
+    clean_price = price_text.replace(',', '').strip().lstrip('£$€')
+    if clean_price[:1].isdigit():
+        try:
+            return float(clean_price)
+        except ValueError:
+            pass  # Ranges and trailing text fall through to the regex
+    price_match = PRICE_PATTERN.search(clean_price)
+    if price_match:
+        return float(price_match.group(1))
+    return None
+
+
+def first_texts(response, selectors):
+    """Yield the first text of each selector that matches, in priority order"""
+    root = response.selector.root
+    for selector in selectors:
+        hits = selector(root)
+        if hits:
+            yield hits[0]
+
+
+class DailyLogFileHandler(TimedRotatingFileHandler):
+    """Rolls over at midnight into the next day's config.get_log_filename() file"""
+
+    def __init__(self, filename, encoding=None):
+        super().__init__(filename, when='midnight', encoding=encoding)
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        self.baseFilename = os.path.abspath(config.get_log_filename())
+        self.stream = self._open()
+        self.rolloverAt = self.computeRollover(int(time.time()))
+
+
+def install_daily_log_handler(log_file):
+    """Swap Scrapy's LOG_FILE handler for one that follows the date"""
+    if not log_file:
+        return
+    root = logging.getLogger()
+    log_path = os.path.abspath(log_file)
+    for handler in list(root.handlers):
+        if type(handler) is not logging.FileHandler or handler.baseFilename != log_path:
+            continue
+        daily_handler = DailyLogFileHandler(log_file, encoding=handler.encoding)
+        daily_handler.setLevel(handler.level)
+        daily_handler.setFormatter(handler.formatter)
+        for log_filter in handler.filters:
+            daily_handler.addFilter(log_filter)
+        root.removeHandler(handler)
+        handler.close()
+        root.addHandler(daily_handler)
+
+
 class AmazonSpider(scrapy.Spider):
     name = 'amazon_spider'
     allowed_domains = [config.AMAZON_DOMAINS[config.DEFAULT_DOMAIN]]
@@ -16,6 +232,16 @@ class AmazonSpider(scrapy.Spider):
     # Configuration
     KEYWORDS = config.KEYWORDS
     MAX_PAGES = config.MAX_PAGES_PER_KEYWORD
+    
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super(AmazonSpider, cls).from_crawler(crawler, *args, **kwargs)
+        # Scrapy installs its log handler after the spider is created, so swap it once opened
+        crawler.signals.connect(spider._install_daily_log_handler, signal=signals.spider_opened)
+        return spider
+    
+    def _install_daily_log_handler(self, spider):
+        install_daily_log_handler(self.settings.get('LOG_FILE'))
         
     def __init__(self, keywords=None, max_pages=None, domain=None, generate_keywords=None, 
                 categories=None, use_db_keywords=None, *args, **kwargs):
@@ -25,6 +251,18 @@ class AmazonSpider(scrapy.Spider):
         self.db_manager = None
         self.keyword_generator = None
         
+        # ASINs already requested / parsed in this run; overlapping keywords and
+        # pages list the same products, so repeats are skipped before fetching
+        self.requested_asins = set()
+        self.parsed_asins = set()
+        
+        # Search-page attempts per (keyword, domain, category), written in periodic batches
+        self.keyword_attempts = Counter()
+        self._attempts_flush_loop = None
+        
+        # Stored priority of database keywords, used as their search request priority
+        self.keyword_priorities = {}
+        
         if config.MONGODB_ENABLED:
             self.db_manager = get_db_manager()
             self.keyword_generator = get_keyword_generator()
@@ -67,7 +305,8 @@ class AmazonSpider(scrapy.Spider):
                 )
                 
                 if db_keywords:
-                    self.KEYWORDS = db_keywords
+                    self.KEYWORDS = list(db_keywords)
+                    self.keyword_priorities = db_keywords
                     self.logger.info(f"Using {len(db_keywords)} keywords from database")
                 else:
                     self.logger.warning("No keywords found in database, using config keywords")
@@ -81,17 +320,20 @@ class AmazonSpider(scrapy.Spider):
             self.logger.info(f"Using {len(self.KEYWORDS)} keywords from config")
 
         if self.db_manager and hasattr(self, 'KEYWORDS'):
-            self.keyword_categories = {}  # Store keyword -> category mapping
-            for keyword in self.KEYWORDS:
-                keyword_doc = self.db_manager.db[config.get_collection_name('keywords')].find_one({
-                    'keyword': keyword,
-                    'domain': target_domain
-                })
-                if keyword_doc:
-                    self.keyword_categories[keyword] = keyword_doc.get('category', 'Unknown')
-                    self.logger.info(f"Keyword '{keyword}' has category: {keyword_doc.get('category')}")
-                else:
-                    self.keyword_categories[keyword] = 'Unknown'
+            # Store keyword -> category mapping, fetched for all keywords in one query
+            # (served by the unique keyword/domain/category index prefix)
+            found_categories = {}
+            cursor = self.db_manager.keywords_collection.find(
+                {'keyword': {'$in': list(self.KEYWORDS)}, 'domain': target_domain},
+                {'keyword': 1, 'category': 1, '_id': 0}
+            )
+            for keyword_doc in cursor:
+                found_categories.setdefault(keyword_doc['keyword'], keyword_doc.get('category', 'Unknown'))
+            
+            self.keyword_categories = {
+                keyword: found_categories.get(keyword, 'Unknown') for keyword in self.KEYWORDS
+            }
+            self.logger.info(f"Found categories for {len(found_categories)} of {len(self.KEYWORDS)} keywords")
         
         # Set other parameters
         if max_pages:
@@ -101,15 +343,24 @@ class AmazonSpider(scrapy.Spider):
         
     def start_requests(self):
         """Generate initial requests for each keyword"""
-        for keyword in self.KEYWORDS:
-            domain_name = self.allowed_domains[0]  # e.g., 'amazon.com'
-            search_url = f"https://{domain_name}/s?k={keyword.replace(' ', '+')}"
+        if self.db_manager:
+            # Attempt counts are written in batches rather than once per search page
+            self._attempts_flush_loop = task.LoopingCall(self.flush_keyword_attempts)
+            self._attempts_flush_loop.start(config.KEYWORD_ATTEMPTS_FLUSH_INTERVAL, now=False)
+        
+        domain_name = self.allowed_domains[0]  # e.g., 'amazon.com'
+        keyword_categories = getattr(self, 'keyword_categories', {})
+        for index, keyword in enumerate(self.KEYWORDS):
+            search_url = f"https://{domain_name}/s?k={quote_plus(keyword)}"
             self.logger.info(f"Starting request for: {search_url}") 
-            category = getattr(self, 'keyword_categories', {}).get(keyword, 'Unknown')
+            category = keyword_categories.get(keyword, 'Unknown')
 
             yield scrapy.Request(
                 url=search_url,
                 callback=self.parse_search_results,
+                # The scheduler pops the highest priority first (LIFO among equals), so
+                # database keywords use their stored priority and listed ones keep their order
+                priority=self.keyword_priorities.get(keyword, -index),
                 meta={
                     'keyword': keyword,
                     'page': 1,
@@ -120,36 +371,47 @@ class AmazonSpider(scrapy.Spider):
 
     def parse_search_results(self, response):
         """Parse search results page and extract product URLs"""
-        keyword = response.meta['keyword']
-        page = response.meta['page']
-        domain = response.meta['domain']
+        meta = response.meta
+        keyword = meta['keyword']
+        page = meta['page']
+        domain = meta['domain']
+        category = meta.get('category', 'Unknown')
+        
+        # One meta dict per page, shared by every product request (Request copies it)
+        meta_out = {
+            'keyword': keyword,
+            'page': page,
+            'domain': domain,
+            'category': category
+        }
 
         # Increment keyword scraping attempts - ADD THIS BACK
         if self.db_manager:
-            category = response.meta.get('category', 'Unknown')
-            self.db_manager.increment_keyword_attempts(keyword, domain, category)
+            self.keyword_attempts[(keyword, domain, category)] += 1
 
         # Extract unique product URLs from main search results
-        product_urls = []
-        unique_links = {}
+        page_products = {}  # ASIN -> product link, in page order
         
-        # Get all result items with ASIN (main products)
-        for item in response.css('.s-result-item[data-asin]'):
-            asin = item.css('::attr(data-asin)').get()
+        # Get all result items with ASIN (main products), without wrapping each node in a Selector
+        for item in SEARCH_RESULT_ITEMS_XPATH(response.selector.root):
+            asin = item.get('data-asin')
             
-            # Skip empty ASINs and sponsored items
-            if not asin or item.css(':contains("Sponsored")'):
+            # Skip already collected ASINs before the costlier checks
+            if asin in page_products:
+                continue
+            
+            # Skip sponsored items
+            if SPONSORED_XPATH(item):
                 continue
                 
             # Get the main product link (first link with /dp/ in this item)
-            link = item.css('a[href*="/dp/"]::attr(href)').get()
+            links = PRODUCT_LINK_XPATH(item)
             
-            if link and asin not in unique_links:
-                unique_links[asin] = link
-                product_urls.append(link)
+            if links:
+                page_products[asin] = str(links[0])
         
         # # OPTIONAL: Remove variants (uncomment if you want unique products only)
-        # # This is already handled above by using unique_links dictionary
+        # # This is already handled above by keying page_products on ASIN
         # unique_products = []
         # seen_asins = set()
         # 
@@ -167,25 +429,33 @@ class AmazonSpider(scrapy.Spider):
         # 
         # product_urls = unique_products
         
-        self.logger.info(f"Found {len(product_urls)} unique main products on page {page} for keyword '{keyword}'")
+        products_found = len(page_products)
+        self.logger.info(f"Found {products_found} unique main products on page {page} for keyword '{keyword}'")
         
         # Process each product URL
-        for url in product_urls:
+        for asin, url in page_products.items():
+            # Already requested from another page or keyword in this run
+            if asin in self.requested_asins:
+                continue
+            self.requested_asins.add(asin)
+            
+            # Scraped in an earlier run: the duplicates pipeline would drop it after the fetch.
+            # The preloaded bloom filter answers most of these without a MongoDB query
+            if self.db_manager and self.db_manager.is_product_scraped(asin, domain):
+                continue
+            
             full_url = urljoin(response.url, url)
             yield scrapy.Request(
                 url=full_url,
                 callback=self.parse_product,
-                meta={
-                    'keyword': keyword,
-                    'page': page,
-                    'domain': domain,
-                    'category': response.meta.get('category', 'Unknown')
-                }
+                meta=meta_out,
+                priority=config.PRODUCT_REQUEST_PRIORITY  # Drain product pages before more pagination
             )
         
-        products_found = len(product_urls)
+        # Next page URL is needed both for the scraped check and for pagination
+        next_page_url = self.get_next_page_url(response, keyword, page) if page < self.MAX_PAGES else None
+        
         if self.db_manager:
-            category = response.meta.get('category', 'Unknown')
             should_mark_scraped = False
             
             # Mark as scraped if we've reached max pages OR no next page exists
@@ -193,7 +463,6 @@ class AmazonSpider(scrapy.Spider):
                 should_mark_scraped = True
             else:
                 # Check if there's actually a next page available
-                next_page_url = self.get_next_page_url(response, keyword, page)
                 if not next_page_url or not self.has_next_page_results(response):
                     should_mark_scraped = True
             
@@ -202,295 +471,222 @@ class AmazonSpider(scrapy.Spider):
                 self.logger.info(f"Marked keyword '{keyword}' as scraped with {products_found} products")
     
         # Follow pagination if within limit
-        if page < self.MAX_PAGES:
-            next_page_url = self.get_next_page_url(response, keyword, page)
-            if next_page_url:
-                yield scrapy.Request(
-                    url=next_page_url,
-                    callback=self.parse_search_results,
-                    meta={
-                        'keyword': keyword,
-                        'page': page + 1,
-                        'domain': self.target_domain,
-                        'category': response.meta.get('category', 'Unknown')
-                    }
-                )
+        if next_page_url:
+            next_meta = dict(meta_out)
+            next_meta['page'] = page + 1
+            next_meta['domain'] = self.target_domain
+            yield scrapy.Request(
+                url=next_page_url,
+                callback=self.parse_search_results,
+                meta=next_meta,
+                priority=response.request.priority  # Later pages keep their keyword's priority
+            )
     
     def has_next_page_results(self, response):
         """Check if there are more pages with results"""
         # Check if pagination exists and has next page
-        next_page_selectors = [
-            '.s-pagination-next:not(.s-pagination-disabled)',
-            'a[aria-label="Go to next page"]',
-            '.a-pagination .a-last:not(.a-disabled)'
-        ]
-        
-        for selector in next_page_selectors:
-            if response.css(selector).get():
-                return True
-        
-        return False
+        return NEXT_PAGE_SELECTOR(response.selector.root)
     
     def get_next_page_url(self, response, keyword, current_page):
         """Generate next page URL"""
         next_page = current_page + 1
-        base_url = f"https://amazon.com/s?k={keyword.replace(' ', '+')}"
+        base_url = f"https://{self.allowed_domains[0]}/s?k={quote_plus(keyword)}"
         return f"{base_url}&page={next_page}"
     
     def parse_product(self, response):
         """Parse individual product page"""
-        item = AmazonProductItem()
-        
         # Extract ASIN from URL
-        asin_match = re.search(r'/dp/([A-Z0-9]{10})', response.url)
-        item['ASIN'] = asin_match.group(1) if asin_match else None
-        
-        # Basic product information
-        item['Title'] = self.extract_title(response)
-        item['ProductURL'] = response.url
-        item['Brand'] = self.extract_brand(response)
-        
-        # Ratings and reviews
-        item['StarRating'] = self.extract_star_rating(response)
-        item['NumberOfRatings'] = self.extract_number_of_ratings(response)
-        
-        # Pricing
-        item['Price'] = self.extract_price(response)
-        item['ShippingCost'] = self.extract_shipping_cost(response)
-        
-        # Rankings - UPDATED WITH WORKING SELECTORS
-        item['BestSellerRank'] = self.extract_best_seller_rank(response)
-        item['SalesSubRank'] = self.extract_sales_sub_rank(response)
-        item['SalesSubSubRank'] = self.extract_sales_sub_sub_rank(response)
-        
-        # Delivery information - UPDATED WITH WORKING SELECTORS
-        delivery_info = self.extract_delivery_info(response)
-        item.update(delivery_info)
-        
-        # Seller information - UPDATED WITH WORKING SELECTORS
-        seller_info = self.extract_seller_info(response)
-        item.update(seller_info)
-        
-        # Prime and availability
-        item['IsPrime'] = self.extract_prime_status(response)
-        item['Prime'] = item['IsPrime']  # Duplicate field
-        item['AvailableQuantity'] = self.extract_available_quantity(response)
-        
-        # Additional fields - UPDATED WITH WORKING SELECTORS
-        item['ListingDate'] = self.extract_listing_date(response)
-        item['CustomerServiceProvider'] = self.extract_customer_service_provider(response)
-        item['SellerOffersCount'] = self.extract_seller_offers_count(response)
-        item['IsBuyBoxWinner'] = self.extract_buy_box_winner(response)
-        
-        # Metadata
-        item['ScrapedAt'] = datetime.now().isoformat()
-        item['Keyword'] = response.meta['keyword']
-        item['Domain'] = self.target_domain
-        item['PageNumber'] = response.meta['page']
+        asin_match = ASIN_URL_PATTERN.search(response.url)
+        if asin_match:
+            # Redirects can land several requests on one product; extract it once
+            asin = asin_match.group(1)
+            if asin in self.parsed_asins:
+                return
+            self.parsed_asins.add(asin)
+        is_prime = self.extract_prime_status(response)
+        
+        # Locate the shared sections in one pass, then join each text block once
+        sections = index_sections(response.selector.root)
+        buybox_text = section_text(sections, 'buybox')
+        apex_text = section_text(sections, 'apex_desktop')
+        delivery_block_text = section_text(sections, 'mir-layout-DELIVERY_BLOCK')
+        context_text = section_text(sections, 'contextualIngressPt')
+        bullets_text = section_text(sections, 'detailBulletsWrapper_feature_div')
+        product_details = sections.get('productDetails_detailBullets_sections1')
+        rank_texts = BEST_SELLER_RANK_XPATH(product_details) if product_details is not None else []
+        
+        item = AmazonProductItem(
+            ASIN=asin_match.group(1) if asin_match else None,
+            
+            # Basic product information
+            Title=self.extract_title(response),
+            ProductURL=response.url,
+            Brand=self.extract_brand(response),
+            
+            # Ratings and reviews
+            StarRating=self.extract_star_rating(response),
+            NumberOfRatings=self.extract_number_of_ratings(response),
+            
+            # Pricing
+            Price=self.extract_price(response),
+            ShippingCost=self.extract_shipping_cost(response, buybox_text, apex_text, delivery_block_text),
+            
+            # Rankings - UPDATED WITH WORKING SELECTORS
+            BestSellerRank=self.extract_best_seller_rank(response, rank_texts, bullets_text),
+            SalesSubRank=self.extract_sales_sub_rank(response, rank_texts),
+            SalesSubSubRank=self.extract_sales_sub_sub_rank(response, rank_texts),
+            
+            # Prime and availability
+            IsPrime=is_prime,
+            AvailableQuantity=self.extract_available_quantity(response, buybox_text, apex_text),
+            
+            # Additional fields - UPDATED WITH WORKING SELECTORS
+            ListingDate=self.extract_listing_date(response, product_details),
+            CustomerServiceProvider=self.extract_customer_service_provider(response),
+            SellerOffersCount=self.extract_seller_offers_count(response),
+            IsBuyBoxWinner=self.extract_buy_box_winner(response, buybox_text),
+            
+            # Metadata
+            ScrapedAt=datetime.now().isoformat(),
+            Keyword=response.meta['keyword'],
+            Domain=self.target_domain,
+            PageNumber=response.meta['page'],
+            
+            # Delivery information - UPDATED WITH WORKING SELECTORS
+            **self.extract_delivery_info(response, buybox_text, delivery_block_text, context_text),
+            
+            # Seller information - UPDATED WITH WORKING SELECTORS
+            **self.extract_seller_info(response, buybox_text)
+        )
         
         yield item
     
     def extract_title(self, response):
         """Extract product title"""
-        title_selectors = [
-            '#productTitle::text',
-            '.product-title::text',
-            'h1 span::text',
-            'h1::text'
-        ]
-        
-        for selector in title_selectors:
-            title = response.css(selector).get()
+        for title in first_texts(response, TITLE_SELECTORS):
+            title = title.strip()
             if title:
-                return title.strip()
+                return title
         return None
     
     def extract_brand(self, response):
         """Extract brand name"""
-        brand_selectors = [
-            '#bylineInfo::text',
-            '#bylineInfo a::text',
-            '.a-offscreen::text',
-            'tr:contains("Brand") td::text',
-            'tr:contains("Manufacturer") td::text',
-            'span:contains("Brand")::text',
-            'span:contains("by") a::text'
-        ]
-        
-        for selector in brand_selectors:
-            brand = response.css(selector).get()
-            if brand:
-                clean_brand = brand.strip().replace('by ', '').replace('Brand:', '').strip()
-                if clean_brand and len(clean_brand) > 1:
-                    return clean_brand
+        for brand in first_texts(response, BRAND_SELECTORS):
+            clean_brand = brand.strip().replace('by ', '').replace('Brand:', '').strip()
+            if clean_brand and len(clean_brand) > 1:
+                return clean_brand
         return None
     
     def extract_star_rating(self, response):
         """Extract star rating"""
-        rating_selectors = [
-            '[data-hook="average-star-rating"] .a-icon-alt::text',
-            '.a-icon-alt::text',
-            '[data-hook="rating-out-of-text"]::text',
-            'span:contains("out of 5")::text',
-            '.cr-widget-FocusReviews .a-icon-alt::text'
-        ]
-        
-        for selector in rating_selectors:
-            rating_text = response.css(selector).get()
-            if rating_text:
-                rating_match = re.search(r'(\d+\.?\d*)\s*out\s*of\s*5', rating_text)
-                if rating_match:
-                    return float(rating_match.group(1))
+        for rating_text in first_texts(response, STAR_RATING_SELECTORS):
+            rating_match = STAR_RATING_PATTERN.search(rating_text)
+            if rating_match:
+                return float(rating_match.group(1))
         return None
     
     def extract_number_of_ratings(self, response):
         """Extract number of ratings"""
-        rating_selectors = [
-            '[data-hook="total-review-count"]::text',
-            '#acrCustomerReviewText::text',
-            'span[data-hook="total-review-count"]::text',
-            'a:contains("ratings")::text',
-            'span:contains("ratings")::text'
-        ]
-        
-        for selector in rating_selectors:
-            rating_text = response.css(selector).get()
-            if rating_text:
-                rating_match = re.search(r'([\d,]+)', rating_text.replace(',', ''))
-                if rating_match:
-                    return int(rating_match.group(1))
+        for rating_text in first_texts(response, RATING_COUNT_SELECTORS):
+            rating_match = RATING_COUNT_PATTERN.search(rating_text.replace(',', ''))
+            if rating_match:
+                return int(rating_match.group(1))
         return None
     
     def extract_price(self, response):
         """Extract price"""
-        price_selectors = [
-            '.a-price-whole::text',
-            '.a-price.a-text-price.a-size-medium.apexPriceToPay .a-offscreen::text',
-            '.a-price .a-offscreen::text',
-            '#priceblock_ourprice::text',
-            '#priceblock_dealprice::text',
-            '.a-price-range .a-price .a-offscreen::text',
-            'span.a-price-symbol + span.a-price-whole::text'
-        ]
-        
-        for selector in price_selectors:
-            price_text = response.css(selector).get()
-            if price_text:
-                # Clean price text and extract number
-                clean_price = price_text.replace('£', '').replace(',', '').strip()
-                price_match = re.search(r'(\d+\.?\d*)', clean_price)
-                if price_match:
-                    return float(price_match.group(1))
+        for price_text in first_texts(response, PRICE_SELECTORS):
+            price = parse_price(price_text)
+            if price is not None:
+                return price
         return None
     
-    def extract_shipping_cost(self, response):
+    def extract_shipping_cost(self, response, buybox_text, apex_text, delivery_block_text):
         """Extract shipping cost - UPDATED WITH MULTIPLE PRODUCT LAYOUTS"""
         # Method 1: JBL-style product (mir-layout-DELIVERY_BLOCK)
-        delivery_text = response.css('#mir-layout-DELIVERY_BLOCK *::text').getall()
-        if delivery_text:
-            full_text = ' '.join(delivery_text)
-            if 'FREE delivery' in full_text:
+        if delivery_block_text:
+            if delivery_block_text.find('FREE delivery') != -1:
                 return 0.0
             
             # Look for shipping cost pattern
-            cost_match = re.search(r'£(\d+\.?\d*)', full_text)
+            cost_match = SHIPPING_COST_PATTERN.search(delivery_block_text)
             if cost_match:
                 return float(cost_match.group(1))
         
-        # Method 2: Anker-style product (check for FREE Returns/shipping)
-        # Based on shell testing: "FREE Returns" found in apex_desktop
-        if 'FREE Returns' in response.text or 'FREE delivery' in response.text:
-            return 0.0
-        
-        # Method 3: Check buybox for delivery info
-        buybox_text = response.css('#buybox *::text').getall()
-        if buybox_text:
-            full_text = ' '.join(buybox_text)
-            if 'FREE' in full_text and ('delivery' in full_text.lower() or 'shipping' in full_text.lower()):
-                return 0.0
-        
-        # Method 4: Check apex_desktop for shipping info
-        apex_text = response.css('#apex_desktop *::text').getall()
-        if apex_text:
-            full_text = ' '.join(apex_text)
-            if 'FREE' in full_text and ('delivery' in full_text.lower() or 'shipping' in full_text.lower()):
-                return 0.0
+        # Method 2: Check buybox, then apex_desktop, for free delivery info
+        for full_text in (buybox_text, apex_text):
+            if full_text.find('FREE') != -1:
+                lower_text = full_text.lower()
+                if 'delivery' in lower_text or 'shipping' in lower_text:
+                    return 0.0
         
         return None
     
-    def extract_best_seller_rank(self, response):
+    def extract_best_seller_rank(self, response, rank_texts, bullets_text):
         """Extract best seller rank - UPDATED WITH MULTIPLE PRODUCT LAYOUTS"""
         # Method 1: JBL-style product (productDetails_detailBullets_sections1)
-        rank_text = response.css('#productDetails_detailBullets_sections1 tr:contains("Best Sellers Rank") td span li span span::text').get()
-        if rank_text:
-            rank_match = re.search(r'(\d+)', rank_text)
+        if rank_texts:
+            rank_match = INTEGER_PATTERN.search(rank_texts[0])
             if rank_match:
                 return int(rank_match.group(1))
         
-        # Method 2: Anker-style product (search in page text)
+        # Methods 2 and 3 need the phrase somewhere on the page; checking the raw
+        # bytes skips the document-wide fallback XPath on pages without a rank
+        if b'Best Sellers Rank' not in response.body:
+            return None
+        
+        # Method 2: Anker-style product (search in the detail bullets text)
         # Look for "Best Sellers Rank: 312 in Climate Pledge Friendly"
-        if 'Best Sellers Rank' in response.text:
-            rank_match = re.search(r'Best Sellers Rank:?\s*(\d+)\s+in', response.text)
+        if 'Best Sellers Rank' in bullets_text:
+            rank_match = BEST_SELLER_RANK_TEXT_PATTERN.search(bullets_text)
             if rank_match:
                 return int(rank_match.group(1))
         
-        # Method 3: Additional fallback selectors
-        fallback_selectors = [
-            '#productDetails_detailBullets_sections1 tr:contains("Best Sellers Rank") td::text',
-            '#productDetails_db_sections tr:contains("Best Sellers Rank") td::text',
-            'tr:contains("Best Sellers Rank") td::text'
-        ]
-        
-        for selector in fallback_selectors:
-            rank_text = response.css(selector).get()
-            if rank_text:
-                rank_match = re.search(r'(\d+)', rank_text)
-                if rank_match:
-                    return int(rank_match.group(1))
+        # Method 3: Any "Best Sellers Rank" table row
+        for rank_text in first_texts(response, BEST_SELLER_RANK_FALLBACK_SELECTORS):
+            rank_match = INTEGER_PATTERN.search(rank_text)
+            if rank_match:
+                return int(rank_match.group(1))
         
         return None
     
-    def extract_sales_sub_rank(self, response):
+    def extract_sales_sub_rank(self, response, rank_texts):
         """Extract sales sub-rank"""
         # Get the category name from best seller rank
-        rank_text = response.css('#productDetails_detailBullets_sections1 tr:contains("Best Sellers Rank") td span li span span::text').get()
-        if rank_text:
+        if rank_texts:
             # Extract category from "430 in In-Ear Headphones"
-            category_match = re.search(r'\d+\s+in\s+(.+)', rank_text)
+            category_match = RANK_CATEGORY_PATTERN.search(rank_texts[0])
             if category_match:
                 return category_match.group(1).strip()
         
         return None
     
-    def extract_sales_sub_sub_rank(self, response):
+    def extract_sales_sub_sub_rank(self, response, rank_texts):
         """Extract sales sub-sub-rank"""
         # Look for additional category rankings in the same section
-        rank_elements = response.css('#productDetails_detailBullets_sections1 tr:contains("Best Sellers Rank") td span li span span::text').getall()
-        if len(rank_elements) > 1:
+        if len(rank_texts) > 1:
             # If there are multiple rankings, return the second one
-            second_rank = rank_elements[1]
-            rank_match = re.search(r'(\d+)', second_rank)
+            second_rank = rank_texts[1]
+            rank_match = INTEGER_PATTERN.search(second_rank)
             if rank_match:
                 return int(rank_match.group(1))
         
         return None
     
-    def extract_delivery_info(self, response):
+    def extract_delivery_info(self, response, buybox_text, delivery_block_text, context_text):
         """Extract delivery information - UPDATED WITH MULTIPLE PRODUCT LAYOUTS"""
         delivery_info = {}
         
         # Method 1: JBL-style product (mir-layout-DELIVERY_BLOCK)
-        delivery_text = response.css('#mir-layout-DELIVERY_BLOCK *::text').getall()
-        if delivery_text:
-            full_text = ' '.join(delivery_text)
+        if delivery_block_text:
+            full_text = delivery_block_text
             delivery_info['FastestDelivery'] = full_text.strip()
             
             # Extract delivery date - WORKING PATTERN
-            date_pattern = re.search(r'(\w+day,\s+\d+\s+\w+)', full_text)
+            date_pattern = DELIVERY_DATE_PATTERN.search(full_text)
             if date_pattern:
                 delivery_date = date_pattern.group(1)
                 delivery_info['DeliveryEstimateFastest'] = delivery_date
-                delivery_info['FastestDeliveryDate'] = delivery_date
                 
                 # Calculate delivery days
                 delivery_days = self.calculate_delivery_days(delivery_date)
@@ -499,168 +695,106 @@ class AmazonSpider(scrapy.Spider):
                     delivery_info['DeliveryDays'] = delivery_days
             
             # Check for today/tomorrow
-            if 'tomorrow' in full_text.lower():
+            lower_text = full_text.lower()
+            if 'tomorrow' in lower_text:
                 delivery_info['DeliveryDaysFastest'] = 1
                 delivery_info['DeliveryDays'] = 1
-            elif 'today' in full_text.lower():
+            elif 'today' in lower_text:
                 delivery_info['DeliveryDaysFastest'] = 0
                 delivery_info['DeliveryDays'] = 0
         
         # Method 2: Anker-style product (check buybox and apex_desktop)
         if not delivery_info.get('FastestDelivery'):
             # Check buybox for delivery info
-            buybox_text = response.css('#buybox *::text').getall()
             if buybox_text:
-                full_text = ' '.join(buybox_text)
-                
                 # Look for delivery patterns
-                delivery_patterns = [
-                    r'delivery\s+(\w+day,?\s+\d+\s+\w+)',
-                    r'arrives\s+(\w+day,?\s+\d+\s+\w+)',
-                    r'get it\s+(\w+day,?\s+\d+\s+\w+)'
-                ]
-                
-                for pattern in delivery_patterns:
-                    date_match = re.search(pattern, full_text, re.IGNORECASE)
-                    if date_match:
-                        delivery_date = date_match.group(1)
-                        delivery_info['DeliveryEstimateFastest'] = delivery_date
-                        delivery_info['FastestDeliveryDate'] = delivery_date
-                        delivery_info['FastestDelivery'] = f"Delivery {delivery_date}"
-                        
-                        # Calculate delivery days
-                        delivery_days = self.calculate_delivery_days(delivery_date)
-                        if delivery_days is not None:
-                            delivery_info['DeliveryDaysFastest'] = delivery_days
-                            delivery_info['DeliveryDays'] = delivery_days
-                        break
+                date_match = BUYBOX_DELIVERY_PATTERN.search(buybox_text)
+                if date_match:
+                    delivery_date = date_match.group(1)
+                    delivery_info['DeliveryEstimateFastest'] = delivery_date
+                    delivery_info['FastestDelivery'] = f"Delivery {delivery_date}"
+                    
+                    # Calculate delivery days
+                    delivery_days = self.calculate_delivery_days(delivery_date)
+                    if delivery_days is not None:
+                        delivery_info['DeliveryDaysFastest'] = delivery_days
+                        delivery_info['DeliveryDays'] = delivery_days
         
         # Method 3: Check contextualIngressPt for delivery location
         if not delivery_info.get('FastestDelivery'):
-            context_text = response.css('#contextualIngressPt *::text').getall()
             if context_text:
-                full_text = ' '.join(context_text)
-                if 'Select delivery location' in full_text:
+                if 'Select delivery location' in context_text:
                     delivery_info['FastestDelivery'] = 'Select delivery location for estimate'
         
         return delivery_info
     
     def calculate_delivery_days(self, delivery_date):
         """Calculate delivery days from date string like 'Tuesday, 8 July'"""
-        try:
-            # Simple day calculation
-            today = datetime.now()
-            weekdays = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-            
-            # Extract day name
-            day_match = re.search(r'(\w+day)', delivery_date)
-            if day_match:
-                day_name = day_match.group(1)
-                if day_name in weekdays:
-                    today_weekday = today.weekday()  # 0=Monday, 6=Sunday
-                    target_weekday = weekdays.index(day_name)
-                    
-                    if target_weekday >= today_weekday:
-                        return target_weekday - today_weekday
-                    else:
-                        return 7 - (today_weekday - target_weekday)
-        except:
-            pass
+        # Extract day name
+        day_match = WEEKDAY_PATTERN.search(delivery_date)
+        if not day_match:
+            return None
         
-        return None
+        target_weekday = WEEKDAY_INDEX.get(day_match.group(1))
+        if target_weekday is None:
+            return None
+        
+        # Days until the next such weekday (0 when it is today)
+        return (target_weekday - datetime.now().weekday()) % 7
     
-    def extract_seller_info(self, response):
+    def extract_seller_info(self, response, buybox_text):
         """Extract seller information - UPDATED WITH MULTIPLE PRODUCT LAYOUTS"""
         seller_info = {}
         
-        # Method 1: Get buybox text (works for both product types)
-        buybox_text = response.css('#buybox *::text').getall()
+        # Method 1: Use buybox text (works for both product types)
         if buybox_text:
-            full_text = ' '.join(buybox_text)
+            full_text = buybox_text
             
             # Extract seller name - improved regex for cleaner extraction
-            # Based on shell testing: "Sold by: AnkerDirect UK", "Dispatches from: Amazon"
-            sold_by_patterns = [
-                r'Sold by:\s*([^,\n]+?)(?:\s*Dispatches|\s*Returns|\s*$)',
-                r'Sold by\s+([A-Za-z\s&\-\.]+?)(?:\s{2,}|\s*Returns|\s*$)',
-                r'Sold by:\s*([^,\n\r]+?)(?:\s*[\n\r]|$)'
-            ]
-            
-            for pattern in sold_by_patterns:
-                sold_by_match = re.search(pattern, full_text, re.IGNORECASE)
-                if sold_by_match:
-                    seller_name = sold_by_match.group(1).strip()
-                    if seller_name and len(seller_name) > 1:
-                        seller_info['SoldBy'] = seller_name
-                        seller_info['SellerName'] = seller_name
-                        break
+            for sold_by_match in SOLD_BY_PATTERN.finditer(full_text):
+                seller_name = (sold_by_match.group('labelled') or sold_by_match.group('plain')).strip()
+                if seller_name and len(seller_name) > 1:
+                    seller_info['SoldBy'] = seller_name
+                    break
             
             # Extract dispatches from - improved regex
-            dispatch_patterns = [
-                r'Dispatches from:\s*([^,\n]+?)(?:\s*Sold by|\s*Returns|\s*$)',
-                r'Dispatches from\s+([A-Za-z\s&\-\.]+?)(?:\s{2,}|\s*Sold by|\s*$)',
-                r'Dispatches from:\s*([^,\n\r]+?)(?:\s*[\n\r]|$)'
-            ]
-            
-            for pattern in dispatch_patterns:
-                dispatches_match = re.search(pattern, full_text, re.IGNORECASE)
-                if dispatches_match:
-                    dispatch_from = dispatches_match.group(1).strip()
-                    if dispatch_from and len(dispatch_from) > 1:
-                        seller_info['DispatchesFrom'] = dispatch_from
-                        break
+            for dispatches_match in DISPATCH_PATTERN.finditer(full_text):
+                dispatch_from = (dispatches_match.group('labelled') or dispatches_match.group('plain')).strip()
+                if dispatch_from and len(dispatch_from) > 1:
+                    seller_info['DispatchesFrom'] = dispatch_from
+                    break
         
         # Method 2: Try alternative selectors for seller info
         if not seller_info.get('SoldBy'):
-            seller_selectors = [
-                '#merchant-info a::text',
-                '#soldByThirdParty a::text',
-                'span:contains("Sold by")::text'
-            ]
-            
-            for selector in seller_selectors:
-                seller = response.css(selector).get()
-                if seller:
-                    clean_seller = seller.strip().replace('Sold by ', '').replace(':', '').strip()
-                    if clean_seller and len(clean_seller) > 1:
-                        seller_info['SoldBy'] = clean_seller
-                        seller_info['SellerName'] = clean_seller
-                        break
-        
-        # Check if fulfilled by Amazon
-        if 'amazon' in response.text.lower():
+            for seller in first_texts(response, SELLER_SELECTORS):
+                clean_seller = seller.strip().replace('Sold by ', '').replace(':', '').strip()
+                if clean_seller and len(clean_seller) > 1:
+                    seller_info['SoldBy'] = clean_seller
+                    break
+        
+        # Check if fulfilled by Amazon (from the buybox, not the whole page)
+        if 'amazon' in buybox_text.lower():
             seller_info['FulfilledBy'] = 'Amazon'
         
         return seller_info
     
     def extract_prime_status(self, response):
         """Extract Prime status"""
-        prime_indicators = [
-            'prime',
-            'Prime',
-            'PRIME',
-            'prime-logo',
-            'prime-badge'
-        ]
-        
-        page_text = response.text
-        for indicator in prime_indicators:
-            if indicator in page_text:
-                return True
-        return False
+        # A raw-bytes scan rules out most non-Prime pages before any selector runs
+        body = response.body
+        if b'a-icon-prime' not in body and b'Prime' not in body:
+            return False
+        # Look for the Prime badge elements instead of scanning the whole page
+        return PRIME_BADGE_SELECTOR(response.selector.root)
     
-    def extract_available_quantity(self, response):
+    def extract_available_quantity(self, response, buybox_text, apex_text):
         """Extract available quantity - UPDATED WITH MULTIPLE PRODUCT LAYOUTS"""
         # Method 1: JBL-style product (availability section)
-        quantity_selectors = [
-            '#availability span::text',
-            '#availability::text',
-            '#availability-brief::text'
-        ]
-        
-        for selector in quantity_selectors:
-            quantity_text = response.css(selector).get()
-            if quantity_text:
+        root = response.selector.root
+        for selector in AVAILABILITY_SELECTORS:
+            quantity_texts = selector(root)
+            if quantity_texts and quantity_texts[0]:
+                quantity_text = quantity_texts[0]
                 clean_text = quantity_text.strip().lower()
                 if 'in stock' in clean_text:
                     return 'In Stock'
@@ -673,9 +807,8 @@ class AmazonSpider(scrapy.Spider):
         
         # Method 2: Anker-style product (check buybox for availability)
         # Since #availability section is missing, check buybox
-        buybox_text = response.css('#buybox *::text').getall()
         if buybox_text:
-            full_text = ' '.join(buybox_text).lower()
+            full_text = buybox_text.lower()
             if 'in stock' in full_text:
                 return 'In Stock'
             elif 'out of stock' in full_text:
@@ -687,26 +820,28 @@ class AmazonSpider(scrapy.Spider):
                 return 'In Stock'
         
         # Method 3: Check apex_desktop for availability
-        apex_text = response.css('#apex_desktop *::text').getall()
         if apex_text:
-            full_text = ' '.join(apex_text).lower()
+            full_text = apex_text.lower()
             if 'in stock' in full_text:
                 return 'In Stock'
             elif 'out of stock' in full_text:
                 return 'Out of Stock'
         
         # Method 4: If quantity selector is present, assume in stock
-        if response.css('select[name="quantity"]').get() or response.css('#quantity').get():
+        if QUANTITY_INPUT_SELECTOR(root):
             return 'In Stock'
         
         return None
     
-    def extract_listing_date(self, response):
+    def extract_listing_date(self, response, product_details):
         """Extract listing date - UPDATED WITH WORKING SELECTOR"""
         # Based on shell testing: ' 5 Oct. 2022 '
-        date_text = response.css('#productDetails_detailBullets_sections1 tr:contains("Date First Available") td::text').get()
-        if date_text:
-            clean_date = date_text.strip()
+        # Most pages lack the row; a raw-bytes scan rules that out before the XPath runs
+        if product_details is None or b'Date First Available' not in response.body:
+            return None
+        date_texts = LISTING_DATE_XPATH(product_details)
+        if date_texts:
+            clean_date = date_texts[0].strip()
             if clean_date and clean_date != ' ':
                 return clean_date
         
@@ -722,18 +857,23 @@ class AmazonSpider(scrapy.Spider):
         # Based on shell testing, no additional offers found for this product
         return None
     
-    def extract_buy_box_winner(self, response):
+    def extract_buy_box_winner(self, response, buybox_text):
         """Extract buy box winner status - UPDATED WITH WORKING LOGIC"""
         # Based on shell testing, if there's a main seller displayed, they're the buy box winner
-        buybox_text = response.css('#buybox *::text').getall()
-        if buybox_text:
-            full_text = ' '.join(buybox_text)
-            if 'Sold by' in full_text:
-                return True
-        
-        return False
+        return buybox_text.find('Sold by') != -1
+    
+    def flush_keyword_attempts(self):
+        """Write the attempt counts accumulated since the last flush"""
+        if not self.keyword_attempts:
+            return
+        attempts, self.keyword_attempts = self.keyword_attempts, Counter()
+        self.db_manager.bulk_increment_keyword_attempts(attempts)
     
     def closed(self, reason):
         """Called when spider closes - mark any remaining keywords as attempted"""
         if self.db_manager:
+            if self._attempts_flush_loop and self._attempts_flush_loop.running:
+                self._attempts_flush_loop.stop()
+            self.flush_keyword_attempts()
+            self.db_manager.flush_keyword_updates()
             self.logger.info(f"Spider closed with reason: {reason}")
\ No newline at end of file
@@ -1,7 +1,9 @@
 # config.py - Amazon Scraper Configuration
 
+import logging
 import os
 from datetime import datetime
+from functools import lru_cache
 
 # ==================== API KEYS & AUTHENTICATION ====================
 # ScrapeOps Configuration - Get your free API key from https://scrapeops.io/
@@ -52,14 +54,17 @@ MAX_PAGES_PER_KEYWORD = 1  # Number of pages to scrape per keyword
 MAX_PRODUCTS_PER_PAGE = 20  # Approximate products per page
 DELAY_BETWEEN_REQUESTS = 0.5  # Seconds between requests (recommended: 2-5)
 RANDOMIZE_DELAY = True  # Add randomness to delays
-CONCURRENT_REQUESTS = 16  # Number of concurrent requests (recommended: 1-2)
-CONCURRENT_REQUESTS_PER_DOMAIN = 5  # Concurrent requests per domain
+# Size to the proxy plan: too high triggers 503/429 retry cascades, too low leaves proxies idle
+CONCURRENT_REQUESTS = int(os.getenv('CONCURRENT_REQUESTS', '8'))  # Number of concurrent requests
+CONCURRENT_REQUESTS_PER_DOMAIN = CONCURRENT_REQUESTS  # The spider targets a single domain
+PRODUCT_REQUEST_PRIORITY = 10  # Product pages are scheduled ahead of search pagination
+JOBDIR = None  # Set to a directory to persist the request queue on disk for long runs
 
 # AutoThrottle settings (dynamic delay adjustment)
 AUTOTHROTTLE_ENABLED = True
 AUTOTHROTTLE_START_DELAY = 0.5
 AUTOTHROTTLE_MAX_DELAY = 10
-AUTOTHROTTLE_TARGET_CONCURRENCY = 8.0
+AUTOTHROTTLE_TARGET_CONCURRENCY = float(os.getenv('AUTOTHROTTLE_TARGET_CONCURRENCY', CONCURRENT_REQUESTS))
 AUTOTHROTTLE_DEBUG = True
 
 # ==================== USER AGENT CONFIGURATION ====================
@@ -67,14 +72,16 @@ AUTOTHROTTLE_DEBUG = True
 USER_AGENT_STRATEGY = 'scrapeops'  # Recommended: 'scrapeops' or 'fake_useragent'
 
 # Fallback user agents (used when dynamic sources fail)
-FALLBACK_USER_AGENTS = [
+FALLBACK_USER_AGENTS = (
     'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
     'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
     'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0',
     'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15',
     'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
     'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0'
-]
+)
+# Selection weights for the fallback list above, favouring mainstream Chrome
+FALLBACK_USER_AGENT_WEIGHTS = (0.4, 0.15, 0.15, 0.1, 0.15, 0.05)
 
 # User agent refresh settings
 USER_AGENT_REFRESH_INTERVAL = 3600  # Refresh user agents every hour (seconds)
@@ -103,6 +110,7 @@ CUSTOM_PROXY_LIST = [
 # Proxy rotation settings
 PROXY_ROTATION_ENABLED = True
 PROXY_RETRY_TIMES = 3
+PROXY_MAX_REQUESTS_PER_SECOND = float(os.getenv('PROXY_MAX_REQUESTS_PER_SECOND', '0'))  # Proxy plan rate limit (0 = not set)
 
 # ==================== RETRY & ERROR HANDLING ====================
 # Retry configuration
@@ -119,11 +127,17 @@ DOWNLOAD_WARNSIZE = 33554432  # 32MB
 ENABLE_CACHE = True
 CACHE_EXPIRATION_HOURS = 24
 CACHE_DIR = 'httpcache'
+CACHE_STORAGE = 'scrapy.extensions.httpcache.FilesystemCacheStorage'
 CACHE_IGNORE_HTTP_CODES = [503, 504, 505, 500, 403, 404, 408]
+# RFC2616 policy revalidates stale pages with conditional GETs (ETag / Last-Modified)
+CACHE_POLICY = 'scrapy.extensions.httpcache.RFC2616Policy'
+CACHE_ALWAYS_STORE = True  # Store pages even when the response says not to
+CACHE_IGNORE_RESPONSE_CACHE_CONTROLS = ['no-store', 'no-cache', 'private']  # Amazon marks product pages uncacheable
+CACHE_EXPIRATION_SECS = CACHE_EXPIRATION_HOURS * 3600
 
 # ==================== OUTPUT CONFIGURATION ====================
 # Output settings
-OUTPUT_FORMATS = ['csv', 'json']  # Available: csv, json, xml, jl
+OUTPUT_FORMATS = ['csv', 'jl']  # Available: csv, json, xml, jl (JSON Lines, one item per line)
 OUTPUT_FILENAME_PREFIX = 'amazon_products'
 OUTPUT_TIMESTAMP_FORMAT = '%Y%m%d_%H%M%S'
 
@@ -133,23 +147,21 @@ CSV_QUOTING = 'MINIMAL'  # MINIMAL, ALL, NONNUMERIC, NONE
 
 # JSON output settings
 JSON_ENSURE_ASCII = False
-JSON_INDENT = 2
+JSON_INDENT = None  # Items are written compactly, one per line
 
 # ==================== LOGGING CONFIGURATION ====================
 # Logging settings
 LOG_LEVEL = 'INFO'  # DEBUG, INFO, WARNING, ERROR, CRITICAL
-LOG_FILE = f'logs/amazon_scraper_{datetime.now().strftime("%Y%m%d")}.log'
+LOG_DIR = 'logs'  # Daily log files are written here; see get_log_filename()
 LOG_FORMAT = '%(levelname)s: %(message)s'
 LOG_DATEFORMAT = '%Y-%m-%d %H:%M:%S'
 
-# Create logs directory if it doesn't exist
-os.makedirs('logs', exist_ok=True)
-
 # Enable/disable specific log categories
 LOG_SCRAPY_INFO = True
 LOG_USER_AGENT_ROTATION = False  # Set to True for debugging
 LOG_PROXY_ROTATION = False  # Set to True for debugging
 LOG_BLOCKED_REQUESTS = True
+CAPTCHA_SCAN_MAX_BYTES = 200000  # Skip the CAPTCHA scan for larger 200 responses (block pages are small)
 
 # ==================== DATA VALIDATION ====================
 # Data validation rules
@@ -197,11 +209,7 @@ FIELDS_TO_SCRAPE = [
     'Keyword',
     'Domain',
     'PageNumber',
-    'SellerName',
-    'DeliveryDays',
-    'FastestDeliveryDate',
-    'SlowestDeliveryDate',
-    'Prime'
+    'DeliveryDays'
 ]
 
 # Required fields (scraping will fail if these are missing)
@@ -265,8 +273,14 @@ def get_output_filename(format_type='csv', timestamp=None):
     return f"{OUTPUT_FILENAME_PREFIX}_{timestamp}.{format_type}"
 
 def get_log_filename():
-    """Generate log filename"""
-    return LOG_FILE
+    """Generate log filename for the current day"""
+    return _log_filename_for_day(datetime.now().strftime("%Y%m%d"))
+
+@lru_cache(maxsize=1)
+def _log_filename_for_day(day):
+    """Build the log filename for a day, creating the logs directory on first use"""
+    os.makedirs(LOG_DIR, exist_ok=True)
+    return f'{LOG_DIR}/amazon_scraper_{day}.log'
 
 def validate_config():
     """Validate configuration settings"""
@@ -278,17 +292,32 @@ def validate_config():
     if DELAY_BETWEEN_REQUESTS < 1:
         errors.append("DELAY_BETWEEN_REQUESTS should be at least 1 second")
     
-    if CONCURRENT_REQUESTS > 5:
-        errors.append("CONCURRENT_REQUESTS should not exceed 5 to avoid getting blocked")
+    if len(FALLBACK_USER_AGENT_WEIGHTS) != len(FALLBACK_USER_AGENTS):
+        errors.append("FALLBACK_USER_AGENT_WEIGHTS must have one weight per FALLBACK_USER_AGENTS entry (weights are ignored until fixed)")
+    
+    if AUTOTHROTTLE_ENABLED and AUTOTHROTTLE_TARGET_CONCURRENCY > CONCURRENT_REQUESTS:
+        errors.append(
+            f"AUTOTHROTTLE_TARGET_CONCURRENCY ({AUTOTHROTTLE_TARGET_CONCURRENCY}) exceeds "
+            f"CONCURRENT_REQUESTS ({CONCURRENT_REQUESTS}) and can never be reached"
+        )
+    
+    # DOWNLOAD_DELAY applies per domain slot, so it caps the request rate at 1 / delay
+    if PROXY_MAX_REQUESTS_PER_SECOND:
+        max_rate = 1 / DELAY_BETWEEN_REQUESTS if DELAY_BETWEEN_REQUESTS > 0 else float('inf')
+        if max_rate > PROXY_MAX_REQUESTS_PER_SECOND:
+            errors.append(
+                f"DELAY_BETWEEN_REQUESTS allows up to {max_rate:.1f} requests/s, above the proxy plan's "
+                f"{PROXY_MAX_REQUESTS_PER_SECOND} requests/s; expect 429 retries"
+            )
     
     return errors
 
 # Validate configuration on import
 _config_errors = validate_config()
 if _config_errors:
-    print("Configuration warnings:")
+    _config_logger = logging.getLogger(__name__)
     for error in _config_errors:
-        print(f"  - {error}")
+        _config_logger.warning(f"Configuration warning: {error}")
 
 
 # ==================== MONGODB CONFIGURATION ====================
@@ -306,9 +335,18 @@ MONGODB_COLLECTIONS = {
 
 # MongoDB performance settings
 MONGODB_BATCH_SIZE = 100  # Batch insert size
+MONGODB_FLUSH_INTERVAL = 2.0  # Seconds between flushes of a part-filled product buffer
+BULK_WRITE_BATCH_SIZE = 500  # Max operations per bulk_write call (stays under 16MB command limit)
+KEYWORD_INSERT_BATCH_SIZE = 10000  # Max keyword documents per insert/upsert batch (small docs, well under 16MB)
 MONGODB_CONNECTION_TIMEOUT = 5000  # milliseconds
 MONGODB_SOCKET_TIMEOUT = 30000  # milliseconds
-MONGODB_MAX_POOL_SIZE = 10
+MONGODB_MAX_POOL_SIZE = 10  # One shared client; only the reactor and the keyword writer thread issue queries
+MONGODB_MIN_POOL_SIZE = 2  # Warm sockets kept for the reactor thread and the keyword writer
+MONGODB_MAX_IDLE_TIME_MS = 300000  # Close pooled sockets idle for 5 minutes
+MONGODB_WAIT_QUEUE_TIMEOUT_MS = 10000  # Max wait for a free pooled socket
+MONGODB_MAX_CONCURRENT_WRITES = 2  # Background product batch writes in flight (leaves pooled sockets for reads)
+MONGODB_COMPRESSORS = 'zstd,snappy,zlib'  # Wire compression, first one supported by client and server wins
+MONGODB_ZLIB_COMPRESSION_LEVEL = -1  # zlib default level
 
 # ==================== DUPLICATE PREVENTION ====================
 # Duplicate checking settings
@@ -319,6 +357,7 @@ DUPLICATE_CHECK_TIMEFRAME_DAYS = 30  # Only check duplicates within X days
 # Product duplicate settings
 PRODUCT_DUPLICATE_FIELDS = ['ASIN', 'Domain']  # Fields to check for duplicates
 PRODUCT_UPDATE_EXISTING = True  # Update existing products with new data
+UNACKNOWLEDGED_PRODUCT_REFRESH = True  # Refresh already-stored products with w=0 writes (no server ack)
 
 # Keyword duplicate settings
 KEYWORD_DUPLICATE_FIELDS = ['keyword', 'domain', 'category']
@@ -348,6 +387,8 @@ PRODUCT_CATEGORIES = [
 # Keyword generation parameters
 KEYWORDS_PER_CATEGORY = 2  # How many keywords to generate per category
 GENERATION_PROMPTS_COUNT = 1  # How many times to generate keywords (for variety)
+KEYWORD_GENERATION_MAX_CONCURRENCY = 4  # Max generation prompts in flight at once
+KEYWORD_SEEN_CACHE_SIZE = 100000  # Keywords remembered per process to skip repeat upserts
 MAX_KEYWORDS_PER_RUN = 50  # Maximum keywords to process in one scraping run
 
 # Keyword generation prompt template
@@ -366,7 +407,11 @@ Return only the keywords, one per line, without numbers or bullets.
 # ==================== PERFORMANCE OPTIMIZATION ====================
 # Database performance settings
 USE_MONGODB_INDEXES = True  # Create indexes for fast lookups
+INDEX_BEST_SELLER_RANK = False  # Sparse index on BestSellerRank (only needed for rank queries)
 ENABLE_ASYNC_DB_OPERATIONS = True  # Use async operations where possible
+KEYWORD_UPDATE_BATCH_SIZE = 500  # Max keyword status updates per background bulk write
+KEYWORD_UPDATE_FLUSH_INTERVAL = 0.2  # Seconds to wait for a batch to fill before writing
+KEYWORD_ATTEMPTS_FLUSH_INTERVAL = 30  # Seconds the spider accumulates keyword attempt counts between writes
 CACHE_DB_QUERIES = True  # Cache frequent queries in memory
 DB_QUERY_CACHE_SIZE = 1000  # Number of queries to cache
 DB_QUERY_CACHE_TTL = 3600  # Cache TTL in seconds
@@ -374,7 +419,12 @@ DB_QUERY_CACHE_TTL = 3600  # Cache TTL in seconds
 # Scraping optimization with DB
 BATCH_KEYWORD_PROCESSING = True  # Process keywords in batches
 PRELOAD_SCRAPED_ASINS = True  # Load scraped ASINs into memory at start
-ASIN_CACHE_SIZE = 10000  # Number of ASINs to keep in memory cache
+ASIN_CACHE_SIZE = 10000  # Max ASINs kept in the LRU cache, a few MB when full (misses fall back to the bloom filter, then MongoDB)
+ASIN_BLOOM_ERROR_RATE = 0.001  # False positive rate of the preloaded ASIN bloom filter (positives query MongoDB)
+PRELOAD_CURSOR_BATCH_SIZE = 10000  # Documents per round-trip when preloading caches
+MAX_KEYWORD_SCRAPING_ATTEMPTS = 3  # Keywords with this many failed attempts leave the queue
+KEYWORD_CURSOR_BATCH_SIZE = 256  # Documents per round-trip when streaming the keyword queue
+PREWARM_KEYWORD_QUEUE = not DEVELOPMENT_MODE  # Scan the pending keyword queue at startup to warm the server cache
 
 # ==================== DATABASE SCHEMA ====================
 # Keyword document schema
@@ -423,8 +473,6 @@ PRODUCT_SCHEMA = {
     
     # Delivery information
     'FastestDelivery': str,  # Fastest delivery option text
-    'FastestDeliveryDate': str,  # Fastest delivery date
-    'SlowestDeliveryDate': str,  # Slowest delivery date
     'DeliveryDays': int,  # Estimated delivery days
     'DeliveryEstimateFastest': str,  # Fastest delivery estimate
     'DeliveryEstimateSlowest': str,  # Slowest delivery estimate
@@ -432,7 +480,6 @@ PRODUCT_SCHEMA = {
     
     # Seller information
     'SoldBy': str,  # Seller name
-    'SellerName': str,  # Seller display name
     'FulfilledBy': str,  # Fulfillment provider (usually Amazon)
     'DispatchesFrom': str,  # Shipping origin location
     'CustomerServiceProvider': str,  # Customer service provider
@@ -441,7 +488,6 @@ PRODUCT_SCHEMA = {
     
     # Prime and availability
     'IsPrime': bool,  # Prime eligible
-    'Prime': bool,  # Prime status
     'AvailableQuantity': str,  # Stock status (e.g., "In Stock")
     
     # Listing information
@@ -2,6 +2,57 @@
 
 import re
 from datetime import datetime, timedelta
+from functools import lru_cache
+from lxml import etree
+from parsel.csstranslator import css2xpath
+
+ASIN_PATTERN = re.compile(r'/dp/([A-Z0-9]{10})')
+RANK_PATTERN = re.compile(r'#([\d,]+)')
+# Patterns like "Get it tomorrow, 15 Jan", "Tuesday, 16 Jan" or "15-17 Jan", in one pass;
+# ranges come before single days so "15-17 Jan" is not split
+DELIVERY_DATE_PATTERN = re.compile(
+    r'(\w+day,?\s+\d{1,2}\s+\w+|\d{1,2}-\d{1,2}\s+\w+|\d{1,2}\s+\w+|tomorrow|today)',
+    re.IGNORECASE
+)
+
+@lru_cache(maxsize=None)
+def compile_probe(selector):
+    """Compile a probe once; XPath probes start with '/', the rest are CSS"""
+    xpath = selector if selector.startswith('/') else css2xpath(selector)
+    return etree.XPath(xpath, smart_strings=False)
+
+def probe(response, selector):
+    """First match of a probe as text (markup for elements), or None"""
+    hits = compile_probe(selector)(response.selector.root)
+    if not hits:
+        return None
+    hit = hits[0]
+    if isinstance(hit, str):
+        return hit
+    return etree.tostring(hit, encoding='unicode')
+
+@lru_cache(maxsize=None)
+def compile_union(selectors):
+    """Compile a tuple of probes into one boolean XPath union, evaluated in a single tree walk"""
+    union = ' | '.join(s if s.startswith('/') else css2xpath(s) for s in selectors)
+    return etree.XPath(f'boolean({union})')
+
+def first_probe(response, selectors):
+    """(selector, result) of the first non-empty probe; a missing field costs one union walk"""
+    if not compile_union(tuple(selectors))(response.selector.root):
+        return None, None
+    for selector in selectors:
+        result = probe(response, selector)
+        if result:
+            return selector, result
+    return None, None
+
+def probe_text(response, selector):
+    """Whitespace-normalised text of a probe's first element, read in one lxml call, or None"""
+    hits = compile_probe(selector)(response.selector.root)
+    if not hits:
+        return None
+    return ' '.join(etree.tostring(hits[0], method='text', encoding='unicode', with_tail=False).split())
 
 def debug_missing_fields(response):
     """Debug missing fields in Amazon product pages"""
@@ -12,7 +63,7 @@ def debug_missing_fields(response):
     print("=" * 50)
     
     # Extract ASIN for reference
-    asin_match = re.search(r'/dp/([A-Z0-9]{10})', response.url)
+    asin_match = ASIN_PATTERN.search(response.url)
     asin = asin_match.group(1) if asin_match else "Unknown"
     print(f"ASIN: {asin}")
     print("=" * 50)
@@ -24,26 +75,21 @@ def debug_missing_fields(response):
     # Multiple selectors for Best Seller Rank
     rank_selectors = [
         '#SalesRank::text',
-        '#detailBullets_feature_div li:contains("Best Sellers Rank")::text',
-        '#productDetails_detailBullets_sections1 tr:contains("Best Sellers Rank") td::text',
-        '#productDetails_db_sections tr:contains("Best Sellers Rank") td::text',
-        'li:contains("Best Sellers Rank")::text',
-        'span:contains("Best Sellers Rank")::text',
-        'tr:contains("Best Sellers Rank")::text'
+        '//*[@id="detailBullets_feature_div"]//li[contains(., "Best Sellers Rank")]/text()',
+        '//*[@id="productDetails_detailBullets_sections1"]//tr[contains(., "Best Sellers Rank")]//td/text()',
+        '//*[@id="productDetails_db_sections"]//tr[contains(., "Best Sellers Rank")]//td/text()',
+        '//li[contains(., "Best Sellers Rank")]/text()',
+        '//span[contains(., "Best Sellers Rank")]/text()',
+        '//tr[contains(., "Best Sellers Rank")]/text()'
     ]
     
-    for selector in rank_selectors:
-        try:
-            result = response.css(selector).get()
-            if result:
-                print(f"✓ Found with: {selector}")
-                print(f"  Result: {result.strip()}")
-                rank_match = re.search(r'#([\d,]+)', result)
-                if rank_match:
-                    print(f"  Extracted rank: {rank_match.group(1)}")
-                break
-        except:
-            continue
+    selector, result = first_probe(response, rank_selectors)
+    if result:
+        print(f"✓ Found with: {selector}")
+        print(f"  Result: {result.strip()}")
+        rank_match = RANK_PATTERN.search(result)
+        if rank_match:
+            print(f"  Extracted rank: {rank_match.group(1)}")
     else:
         print("✗ Best Seller Rank not found")
         # Let's check what's in the details section
@@ -57,21 +103,16 @@ def debug_missing_fields(response):
     print("-" * 30)
     
     csp_selectors = [
-        '#merchant-info span:contains("Customer service")::text',
-        'tr:contains("Customer service") td::text',
-        'span:contains("Customer service")::text',
-        '#tabular-buybox tr:contains("Customer service") td::text'
+        '//*[@id="merchant-info"]//span[contains(., "Customer service")]/text()',
+        '//tr[contains(., "Customer service")]//td/text()',
+        '//span[contains(., "Customer service")]/text()',
+        '//*[@id="tabular-buybox"]//tr[contains(., "Customer service")]//td/text()'
     ]
     
-    for selector in csp_selectors:
-        try:
-            result = response.css(selector).get()
-            if result:
-                print(f"✓ Found with: {selector}")
-                print(f"  Result: {result.strip()}")
-                break
-        except:
-            continue
+    selector, result = first_probe(response, csp_selectors)
+    if result:
+        print(f"✓ Found with: {selector}")
+        print(f"  Result: {result.strip()}")
     else:
         print("✗ Customer Service Provider not found")
     
@@ -93,45 +134,34 @@ def debug_missing_fields(response):
     
     print("Delivery sections found:")
     for selector in delivery_selectors:
-        try:
-            result = response.css(selector).get()
-            if result:
-                print(f"✓ {selector}: Found")
-                # Extract text content
-                text_content = response.css(f"{selector} *::text").getall()
-                clean_text = ' '.join([t.strip() for t in text_content if t.strip()])
-                print(f"  Text: {clean_text[:100]}...")
-                
-                # Look for specific delivery patterns
-                if any(word in clean_text.lower() for word in ['tomorrow', 'today', 'delivery', 'shipping']):
-                    print(f"  🎯 Contains delivery info!")
-        except:
-            continue
+        clean_text = probe_text(response, selector)
+        if clean_text is not None:
+            print(f"✓ {selector}: Found")
+            print(f"  Text: {clean_text[:100]}...")
+            
+            # Look for specific delivery patterns
+            if any(word in clean_text.lower() for word in ['tomorrow', 'today', 'delivery', 'shipping']):
+                print(f"  🎯 Contains delivery info!")
     
     # 4. Shipping Cost
     print("\n4. SHIPPING COST")
     print("-" * 30)
     
     shipping_selectors = [
-        '#mir-layout-DELIVERY_BLOCK span:contains("FREE")::text',
-        '#deliveryBlockMessage span:contains("FREE")::text',
-        '#shippingMessageInsideBuyBox_feature_div span:contains("FREE")::text',
-        'span:contains("shipping")::text',
-        'span:contains("delivery")::text',
-        '#contextualIngressPt span:contains("FREE")::text'
+        '//*[@id="mir-layout-DELIVERY_BLOCK"]//span[contains(., "FREE")]/text()',
+        '//*[@id="deliveryBlockMessage"]//span[contains(., "FREE")]/text()',
+        '//*[@id="shippingMessageInsideBuyBox_feature_div"]//span[contains(., "FREE")]/text()',
+        '//span[contains(., "shipping")]/text()',
+        '//span[contains(., "delivery")]/text()',
+        '//*[@id="contextualIngressPt"]//span[contains(., "FREE")]/text()'
     ]
     
-    for selector in shipping_selectors:
-        try:
-            result = response.css(selector).get()
-            if result:
-                print(f"✓ Found with: {selector}")
-                print(f"  Result: {result.strip()}")
-                if 'FREE' in result.upper():
-                    print(f"  🎯 Free shipping detected!")
-                break
-        except:
-            continue
+    selector, result = first_probe(response, shipping_selectors)
+    if result:
+        print(f"✓ Found with: {selector}")
+        print(f"  Result: {result.strip()}")
+        if 'FREE' in result.upper():
+            print(f"  🎯 Free shipping detected!")
     else:
         print("✗ Shipping cost not found")
     
@@ -146,26 +176,23 @@ def debug_missing_fields(response):
         '#apex_desktop',
         '#soldByThirdParty',
         '#merchant-info a::text',
-        'span:contains("Sold by")::text',
-        'span:contains("Ships from")::text',
-        'span:contains("Dispatches from")::text'
+        '//span[contains(., "Sold by")]/text()',
+        '//span[contains(., "Ships from")]/text()',
+        '//span[contains(., "Dispatches from")]/text()'
     ]
     
     print("Seller sections found:")
     for selector in seller_selectors:
-        try:
-            result = response.css(selector).get()
+        if selector.endswith(('::text', '/text()')):
+            result = probe(response, selector)
             if result:
                 print(f"✓ {selector}: Found")
-                if selector.endswith('::text'):
-                    print(f"  Text: {result.strip()}")
-                else:
-                    # Extract text content
-                    text_content = response.css(f"{selector} *::text").getall()
-                    clean_text = ' '.join([t.strip() for t in text_content if t.strip()])
-                    print(f"  Text: {clean_text[:100]}...")
-        except:
-            continue
+                print(f"  Text: {result.strip()}")
+        else:
+            clean_text = probe_text(response, selector)
+            if clean_text is not None:
+                print(f"✓ {selector}: Found")
+                print(f"  Text: {clean_text[:100]}...")
     
     # 6. Product Details Section
     print("\n6. PRODUCT DETAILS SECTION")
@@ -181,18 +208,15 @@ def debug_missing_fields(response):
     
     print("Product details sections found:")
     for selector in details_selectors:
-        try:
-            result = response.css(selector).get()
-            if result:
-                print(f"✓ {selector}: Found")
-                # Look for specific fields
-                fields_to_check = ['Date first available', 'ASIN', 'Item model number', 'Manufacturer']
-                for field in fields_to_check:
-                    field_result = response.css(f"{selector} *:contains('{field}')").get()
-                    if field_result:
-                        print(f"  🎯 Contains '{field}'")
-        except:
-            continue
+        result = probe(response, selector)
+        if result:
+            print(f"✓ {selector}: Found")
+            # Look for specific fields
+            fields_to_check = ['Date first available', 'ASIN', 'Item model number', 'Manufacturer']
+            for field in fields_to_check:
+                field_result = response.css(selector).xpath(f'.//*[contains(., "{field}")]').get()
+                if field_result:
+                    print(f"  🎯 Contains '{field}'")
     
     # 7. Availability and Stock
     print("\n7. AVAILABILITY AND STOCK")
@@ -207,18 +231,16 @@ def debug_missing_fields(response):
     ]
     
     for selector in availability_selectors:
-        try:
-            result = response.css(selector).get()
+        if selector.endswith('::text'):
+            result = probe(response, selector)
             if result:
                 print(f"✓ Found with: {selector}")
-                if selector.endswith('::text'):
-                    print(f"  Text: {result.strip()}")
-                else:
-                    text_content = response.css(f"{selector} *::text").getall()
-                    clean_text = ' '.join([t.strip() for t in text_content if t.strip()])
-                    print(f"  Text: {clean_text[:100]}...")
-        except:
-            continue
+                print(f"  Text: {result.strip()}")
+        else:
+            clean_text = probe_text(response, selector)
+            if clean_text is not None:
+                print(f"✓ Found with: {selector}")
+                print(f"  Text: {clean_text[:100]}...")
     
     print("\n" + "=" * 50)
     print("DEBUG COMPLETE")
@@ -233,38 +255,38 @@ def test_specific_selectors(response):
     test_cases = {
         'BestSellerRank': [
             '#SalesRank::text',
-            'li:contains("Best Sellers Rank")::text',
-            'tr:contains("Best Sellers Rank") td::text',
-            'span:contains("Best Sellers Rank")::text'
+            '//li[contains(., "Best Sellers Rank")]/text()',
+            '//tr[contains(., "Best Sellers Rank")]//td/text()',
+            '//span[contains(., "Best Sellers Rank")]/text()'
         ],
         'CustomerServiceProvider': [
-            '#merchant-info span:contains("Customer service")::text',
-            'tr:contains("Customer service") td::text'
+            '//*[@id="merchant-info"]//span[contains(., "Customer service")]/text()',
+            '//tr[contains(., "Customer service")]//td/text()'
         ],
         'DispatchesFrom': [
-            'span:contains("Dispatches from")::text',
-            'span:contains("Ships from")::text',
-            '#tabular-buybox tr:contains("Ships from") td::text'
+            '//span[contains(., "Dispatches from")]/text()',
+            '//span[contains(., "Ships from")]/text()',
+            '//*[@id="tabular-buybox"]//tr[contains(., "Ships from")]//td/text()'
         ],
         'ShippingCost': [
-            '#mir-layout-DELIVERY_BLOCK span:contains("FREE")::text',
-            '#deliveryBlockMessage span:contains("FREE")::text',
-            'span:contains("shipping")::text'
+            '//*[@id="mir-layout-DELIVERY_BLOCK"]//span[contains(., "FREE")]/text()',
+            '//*[@id="deliveryBlockMessage"]//span[contains(., "FREE")]/text()',
+            '//span[contains(., "shipping")]/text()'
         ],
         'SellerOffersCount': [
             '#olp-upd-new-freeshipping a::text',
             '#olp_feature_div a::text',
-            'span:contains("new offers")::text'
+            '//span[contains(., "new offers")]/text()'
         ],
         'IsBuyBoxWinner': [
             '#merchant-info a::text',
             '#soldByThirdParty::text',
-            'span:contains("Sold by")::text'
+            '//span[contains(., "Sold by")]/text()'
         ],
         'ListingDate': [
-            'tr:contains("Date first available") td::text',
-            'li:contains("Date first available")::text',
-            'span:contains("Date first available")::text'
+            '//tr[contains(., "Date first available")]//td/text()',
+            '//li[contains(., "Date first available")]/text()',
+            '//span[contains(., "Date first available")]/text()'
         ]
     }
     
@@ -272,34 +294,18 @@ def test_specific_selectors(response):
         print(f"\n{field}:")
         found = False
         for selector in selectors:
-            try:
-                result = response.css(selector).get()
-                if result:
-                    print(f"  ✓ {selector}: {result.strip()}")
-                    found = True
-                    break
-            except:
-                continue
+            result = probe(response, selector)
+            if result:
+                print(f"  ✓ {selector}: {result.strip()}")
+                found = True
+                break
         if not found:
             print(f"  ✗ No selector worked for {field}")
 
 # Helper function to extract dates
 def extract_delivery_dates(text):
     """Extract delivery dates from text"""
-    dates = []
-    # Look for patterns like "Get it tomorrow, 15 Jan" or "Tuesday, 16 Jan"
-    date_patterns = [
-        r'(\w+day,?\s+\d{1,2}\s+\w+)',
-        r'(\d{1,2}\s+\w+)',
-        r'(tomorrow|today)',
-        r'(\d{1,2}-\d{1,2}\s+\w+)'
-    ]
-    
-    for pattern in date_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        dates.extend(matches)
-    
-    return dates
+    return DELIVERY_DATE_PATTERN.findall(text)
 
 # Instructions for manual testing
 MANUAL_TESTING_INSTRUCTIONS = """
@@ -315,7 +321,7 @@ MANUAL_TESTING_INSTRUCTIONS = """
 
 3. Test individual selectors:
    response.css('#SalesRank::text').get()
-   response.css('li:contains("Best Sellers Rank")::text').getall()
+   response.xpath('//li[contains(., "Best Sellers Rank")]/text()').getall()
    response.css('#merchant-info').get()
 
 4. Check page source:
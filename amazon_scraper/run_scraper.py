@@ -5,9 +5,14 @@ import os
 import sys
 import subprocess
 import argparse
+import importlib.util
 from datetime import datetime
 import config
 
+# CLI defaults derived from config, built once at import
+DOMAIN_CHOICES = tuple(config.AMAZON_DOMAINS)
+DEFAULT_KEYWORDS = ','.join(config.KEYWORDS)
+
 def main():
     parser = argparse.ArgumentParser(description='Run Amazon UK Product Scraper')
     
@@ -17,8 +22,8 @@ def main():
     parser.add_argument('--pages', '-p', type=int, default=config.MAX_PAGES_PER_KEYWORD,
                        help='Number of pages to scrape per keyword')
     parser.add_argument('--output', '-o', type=str, default='csv',
-                       choices=['csv', 'json', 'both'],
-                       help='Output format (csv, json, or both)')
+                       choices=['csv', 'json', 'jl', 'both'],
+                       help='Output format (csv, json, jl (JSON Lines), or both)')
     parser.add_argument('--delay', '-d', type=int, default=config.DELAY_BETWEEN_REQUESTS,
                        help='Delay between requests in seconds')
     parser.add_argument('--concurrent', '-c', type=int, default=config.CONCURRENT_REQUESTS,
@@ -26,21 +31,20 @@ def main():
     parser.add_argument('--log-level', '-l', type=str, default='INFO',
                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
                        help='Log level')
-    parser.add_argument('--use-cache', action='store_true',
-                       help='Enable caching')
+    parser.add_argument('--no-cache', dest='use_cache', action='store_false', default=None,
+                       help='Disable the HTTP cache (enabled by default, revalidated with conditional GETs)')
+    parser.add_argument('--use-cache', dest='use_cache', action='store_true', default=None,
+                       help='Enable the HTTP cache even if ENABLE_CACHE is off in config')
     parser.add_argument('--dry-run', action='store_true',
                        help='Show what would be scraped without running')
     parser.add_argument('--domain', '-dm', type=str, default=config.DEFAULT_DOMAIN,
-                   choices=list(config.AMAZON_DOMAINS.keys()),
+                   choices=DOMAIN_CHOICES,
                    help='Amazon domain to scrape (us, uk, de, fr, etc.)')
     
     args = parser.parse_args()
     
     # Prepare keywords
-    if args.keywords:
-        keywords = args.keywords
-    else:
-        keywords = ','.join(config.KEYWORDS)
+    keywords = args.keywords or DEFAULT_KEYWORDS
     
     # Show dry run information
     if args.dry_run:
@@ -58,30 +62,37 @@ def main():
     # Prepare output filename
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     
-    # Prepare scrapy command
-    cmd = [
-        'scrapy', 'crawl', 'amazon_spider',
-        '-a', f'keywords={keywords}',
-        '-a', f'max_pages={args.pages}',
-        '-s', f'DOWNLOAD_DELAY={args.delay}',
-        '-s', f'CONCURRENT_REQUESTS={args.concurrent}',
-        '-s', f'LOG_LEVEL={args.log_level}',
-    ]
+    # Spider arguments and setting overrides (what `scrapy crawl -a/-s` would pass)
+    spider_kwargs = {
+        'keywords': keywords,
+        'max_pages': args.pages,
+    }
+    if args.domain:
+        spider_kwargs['domain'] = args.domain
+    
+    overrides = {
+        'DOWNLOAD_DELAY': args.delay,
+        'CONCURRENT_REQUESTS': args.concurrent,
+        'LOG_LEVEL': args.log_level,
+    }
     
-    # Add caching if enabled
-    if args.use_cache:
-        cmd.extend(['-s', 'HTTPCACHE_ENABLED=True'])
+    # The HTTP cache follows config.ENABLE_CACHE unless overridden on the command line
+    if args.use_cache is not None:
+        overrides['HTTPCACHE_ENABLED'] = args.use_cache
     
-    # Configure output
+    # Configure output (like `-o`, these replace the FEEDS from settings.py)
+    feeds = {}
     if args.output in ['csv', 'both']:
-        cmd.extend(['-o', f'amazon_products_{timestamp}.csv'])
+        feeds[f'amazon_products_{timestamp}.csv'] = {'format': 'csv'}
     
     if args.output in ['json', 'both']:
-        cmd.extend(['-o', f'amazon_products_{timestamp}.json'])
-
-    if args.domain:
-        cmd.extend(['-a', f'domain={args.domain}'])
-
+        feeds[f'amazon_products_{timestamp}.json'] = {'format': 'json'}
+    
+    if args.output == 'jl':
+        feeds[f'amazon_products_{timestamp}.jl'] = {'format': 'jsonlines'}
+    
+    if feeds:
+        overrides['FEEDS'] = feeds
     
     # Print run information
     print("=== Starting Amazon Scraper ===")
@@ -96,16 +107,27 @@ def main():
     if os.path.exists(scrapy_dir):
         os.chdir(scrapy_dir)
     
-    # Run the scraper
+    # Run the scraper in this interpreter instead of a `scrapy crawl` subprocess
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+    
+    settings = get_project_settings()
+    settings.setdict(overrides, priority='cmdline')
+    
     try:
-        result = subprocess.run(cmd, check=True, capture_output=False)
+        process = CrawlerProcess(settings)
+        crawler = process.create_crawler('amazon_spider')
+        process.crawl(crawler, **spider_kwargs)
+        process.start()
+        
+        if process.bootstrap_failed:
+            print(f"\n=== Scraping Failed ===")
+            print("The spider could not be started, see the log for details")
+            sys.exit(1)
+        
         print("\n=== Scraping Completed Successfully ===")
+        print(f"Items scraped: {crawler.stats.get_value('item_scraped_count', 0)}")
         print(f"Output files created with timestamp: {timestamp}")
-        
-    except subprocess.CalledProcessError as e:
-        print(f"\n=== Scraping Failed ===")
-        print(f"Error: {e}")
-        sys.exit(1)
     
     except KeyboardInterrupt:
         print("\n=== Scraping Interrupted ===")
@@ -125,14 +147,19 @@ def setup_project():
 
 def check_dependencies():
     """Check if required dependencies are installed"""
-    required_packages = ['scrapy', 'requests', 'beautifulsoup4', 'lxml']
-    missing_packages = []
-    
-    for package in required_packages:
-        try:
-            __import__(package)
-        except ImportError:
-            missing_packages.append(package)
+    # Package name -> importable module name
+    required_packages = {
+        'scrapy': 'scrapy',
+        'requests': 'requests',
+        'beautifulsoup4': 'bs4',
+        'lxml': 'lxml',
+    }
+    
+    # find_spec only locates each module, without running its (slow) import
+    missing_packages = [
+        package for package, module in required_packages.items()
+        if importlib.util.find_spec(module) is None
+    ]
     
     if missing_packages:
         print(f"Missing required packages: {', '.join(missing_packages)}")
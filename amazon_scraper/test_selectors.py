@@ -1,273 +1,425 @@
 #!/usr/bin/env python3
 # test_selectors.py - Quick selector testing for missing fields
 
+import io
 import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial, wraps
+from lxml import etree
+from parsel.csstranslator import css2xpath
 
-def test_missing_fields_selectors(response):
-    """Test selectors for all missing fields"""
+ASIN_PATTERN = re.compile(r'/dp/([A-Z0-9]{10})')
+RANK_PATTERN = re.compile(r'#([\d,]+)')
+SHIPPING_COST_PATTERN = re.compile(r'£(\d+\.?\d*)')
+OFFERS_COUNT_PATTERN = re.compile(r'(\d+)')
+DELIVERY_DAYS_PATTERN = re.compile(r'(\d+)[-–]?(\d+)?\s*days?')
+CONTAINS_PHRASE_PATTERN = re.compile(r':contains\("([^"]*)"\)')
+# A text() step ending a union branch; gets a predicate so libxml2 drops whitespace-only nodes
+TEXT_STEP_PATTERN = re.compile(r'/text\(\)(?=\s*\||$)')
+
+# Whole-page text (the string value of the root); every element's text is a substring of it
+PAGE_TEXT_XPATH = etree.XPath('string()', smart_strings=False)
+
+# Phrase each compiled :contains() selector requires, keyed by the compiled XPath
+CONTAINS_PHRASES = {}
+
+def buffered_output(func):
+    """Buffer a test's `out` stream and write its report to stdout in one call, unless the caller passes `out`"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if kwargs.get('out') is not None:
+            return func(*args, **kwargs)
+        kwargs['out'] = out = io.StringIO()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            sys.stdout.write(out.getvalue())
+            sys.stdout.flush()
+    return wrapper
+
+def compile_css(selector):
+    """Translate a CSS selector (parsel's ::text and :contains included) into a compiled XPath"""
+    xpath = etree.XPath(TEXT_STEP_PATTERN.sub('/text()[normalize-space()]', css2xpath(selector)), smart_strings=False)
+    phrase_match = CONTAINS_PHRASE_PATTERN.search(selector)
+    if phrase_match:
+        CONTAINS_PHRASES[xpath] = phrase_match.group(1)
+    return xpath
+
+def compile_tests(tests):
+    """Precompile (selector, description) pairs"""
+    return tuple((compile_css(selector), desc) for selector, desc in tests)
+
+def first_match(xpath, response, page_text=None):
+    """First hit of a compiled selector, or None; :contains() phrases absent from page_text skip the walk"""
+    if page_text is not None:
+        phrase = CONTAINS_PHRASES.get(xpath)
+        if phrase is not None and phrase not in page_text:
+            return None
+    hits = xpath(response.selector.root)
+    return hits[0] if hits else None
+
+@lru_cache(maxsize=None)
+def compile_union(tests):
+    """Compile a test group's selectors into one boolean XPath union, evaluated in a single tree walk"""
+    return etree.XPath(f"boolean({' | '.join(xpath.path for xpath, _ in tests)})")
+
+def group_matches(tests, response, page_text=None):
+    """Yield (description, first hit or None) per selector; a group with no hits costs one union walk"""
+    any_hit = compile_union(tests)(response.selector.root)
+    for selector, desc in tests:
+        yield desc, first_match(selector, response, page_text) if any_hit else None
+
+# Descendant text nodes of a matched element, the equivalent of "<selector> *::text"
+DESCENDANT_TEXT_XPATH = etree.XPath('.//*/text()', smart_strings=False)
+
+# Selectors are translated and compiled once at import instead of on every response.css() call
+BEST_SELLER_TESTS = compile_tests([
+    ('#SalesRank::text', 'SalesRank ID'),
+    ('#detailBullets_feature_div li:contains("Best Sellers Rank")::text', 'Detail bullets'),
+    ('#productDetails_detailBullets_sections1 tr:contains("Best Sellers Rank") td::text', 'Product details table'),
+    ('li:contains("Best Sellers Rank")::text', 'Any list item'),
+    ('span:contains("Best Sellers Rank")::text', 'Any span'),
+    ('*:contains("Best Sellers Rank")::text', 'Any element')
+])
+BESTSELLER_BADGE_SELECTOR = compile_css('span:contains("#1 Best Seller")::text')
+
+CSP_TESTS = compile_tests([
+    ('#tabular-buybox tr:contains("Customer service") td::text', 'Tabular buybox'),
+    ('span:contains("Customer service")::text', 'Any span'),
+    ('tr:contains("Customer service") td::text', 'Any table row'),
+    ('*:contains("Customer service")::text', 'Any element')
+])
+
+DISPATCH_TESTS = compile_tests([
+    ('#tabular-buybox tr:contains("Dispatches from") td::text', 'Tabular buybox - Dispatches'),
+    ('#tabular-buybox tr:contains("Ships from") td::text', 'Tabular buybox - Ships'),
+    ('span:contains("Dispatches from")::text', 'Any span - Dispatches'),
+    ('span:contains("Ships from")::text', 'Any span - Ships'),
+    ('*:contains("Dispatches from")::text', 'Any element - Dispatches'),
+    ('*:contains("Ships from")::text', 'Any element - Ships')
+])
+
+SHIPPING_TESTS = compile_tests([
+    ('#mir-layout-DELIVERY_BLOCK', 'Main delivery block'),
+    ('#deliveryBlockMessage', 'Delivery message'),
+    ('#contextualIngressPt', 'Contextual ingress'),
+    ('#shippingMessageInsideBuyBox_feature_div', 'Shipping message buybox')
+])
+
+OFFERS_TESTS = compile_tests([
+    ('#olp-upd-new-freeshipping a::text', 'OLP new freeshipping'),
+    ('#olp_feature_div a::text', 'OLP feature div'),
+    ('a:contains("new offers")::text', 'New offers link'),
+    ('span:contains("new offers")::text', 'New offers span'),
+    ('a:contains("used offers")::text', 'Used offers link'),
+    ('*:contains("offers")::text', 'Any offers text')
+])
+
+DATE_TESTS = compile_tests([
+    ('#productDetails_detailBullets_sections1 tr:contains("Date first available") td::text', 'Product details - Date'),
+    ('#productDetails_db_sections tr:contains("Date first available") td::text', 'Product DB - Date'),
+    ('li:contains("Date first available")::text', 'List item - Date'),
+    ('span:contains("Date first available")::text', 'Span - Date'),
+    ('*:contains("Date first available")::text', 'Any element - Date')
+])
+
+BUYBOX_TESTS = compile_tests([
+    ('#merchant-info a::text', 'Merchant info link'),
+    ('#soldByThirdParty a::text', 'Sold by third party'),
+    ('span:contains("Sold by")::text', 'Sold by span'),
+    ('#tabular-buybox tr:contains("Sold by") td a::text', 'Tabular buybox sold by')
+])
+
+# Descendant text of every delivery section ("<section> *::text") in one tree walk
+DELIVERY_TEXT_XPATH = etree.XPath(
+    '//*[@id="mir-layout-DELIVERY_BLOCK" or @id="deliveryBlockMessage"'
+    ' or @id="contextualIngressPt" or @id="availability"]//*/text()',
+    smart_strings=False
+)
+
+SECTIONS_TO_CHECK = {
+    'productDetails_detailBullets_sections1': 'Product Details Section 1',
+    'productDetails_db_sections': 'Product DB Sections',
+    'tabular-buybox': 'Tabular Buybox',
+    'merchant-info': 'Merchant Info',
+    'mir-layout-DELIVERY_BLOCK': 'Delivery Block',
+    'availability': 'Availability Section'
+}
+# Ids of the sections above that are on the page, collected in one tree walk
+SECTION_IDS_XPATH = etree.XPath(
+    '//*[' + ' or '.join(f'@id="{section_id}"' for section_id in SECTIONS_TO_CHECK) + ']/@id',
+    smart_strings=False
+)
+
+# Literal phrases looked for in the page text; one alternation scans the page once for all of them
+TEXT_PATTERNS = (
+    'Best Sellers Rank',
+    'Customer service',
+    'Dispatches from',
+    'Ships from',
+    'FREE delivery',
+    'Date first available',
+    'new offers',
+    'Sold by'
+)
+TEXT_PATTERNS_RE = re.compile('|'.join(map(re.escape, TEXT_PATTERNS)))
+
+# Every element a quick-test field reads from, in document order, found in one tree walk
+QUICK_FIELD_ELEMENTS_XPATH = compile_css(
+    '#productTitle, #bylineInfo, #availability, [data-hook="average-star-rating"], .a-price'
+)
+QUICK_FIELD_IDS = {'productTitle': 'Title', 'bylineInfo': 'Brand', 'availability': 'Availability'}
+# Text of each field relative to its element (e.g. "#availability span::text")
+QUICK_FIELD_TEXT_XPATHS = {
+    'Title': etree.XPath('text()', smart_strings=False),
+    'Brand': etree.XPath('text()', smart_strings=False),
+    'Availability': etree.XPath('.//span/text()', smart_strings=False),
+    'StarRating': etree.XPath(
+        './/*[contains(concat(" ", normalize-space(@class), " "), " a-icon-alt ")]/text()', smart_strings=False
+    ),
+    'Price': etree.XPath(
+        './/*[contains(concat(" ", normalize-space(@class), " "), " a-offscreen ")]/text()', smart_strings=False
+    ),
+}
+PRIME_PATTERN = re.compile(rb'prime', re.IGNORECASE)
+
+def quick_field_of(element):
+    """Which quick-test field an element from QUICK_FIELD_ELEMENTS_XPATH belongs to"""
+    field = QUICK_FIELD_IDS.get(element.get('id'))
+    if field:
+        return field
+    if element.get('data-hook') == 'average-star-rating':
+        return 'StarRating'
+    return 'Price'
+
+def read_quick_fields(response):
+    """First text of each quick-test field, from a single walk over the page"""
+    values = {}
+    for element in QUICK_FIELD_ELEMENTS_XPATH(response.selector.root):
+        field = quick_field_of(element)
+        if field in values:
+            continue
+        texts = QUICK_FIELD_TEXT_XPATHS[field](element)
+        if texts:
+            values[field] = texts[0]
+    return values
+
+# Section banners of test_missing_fields_selectors, formatted once
+SECTION_HEADERS = {
+    'BEST SELLER RANK': "\n1. BEST SELLER RANK:\n" + '-' * 30,
+    'CUSTOMER SERVICE PROVIDER': "\n2. CUSTOMER SERVICE PROVIDER:\n" + '-' * 30,
+    'DISPATCHES FROM': "\n3. DISPATCHES FROM:\n" + '-' * 30,
+    'SHIPPING COST': "\n4. SHIPPING COST:\n" + '-' * 30,
+    'SELLER OFFERS COUNT': "\n5. SELLER OFFERS COUNT:\n" + '-' * 30,
+    'LISTING DATE': "\n6. LISTING DATE:\n" + '-' * 30,
+    'BUY BOX WINNER': "\n7. BUY BOX WINNER:\n" + '-' * 30,
+    'DELIVERY DAYS': "\n8. DELIVERY DAYS:\n" + '-' * 30,
+    'GENERAL PAGE CHECKS': "\n9. GENERAL PAGE CHECKS:\n" + '-' * 30
+}
+
+@buffered_output
+def test_missing_fields_selectors(response, exhaustive=False, out=None):
+    """Test selectors for all missing fields; exhaustive=True keeps probing after a field's first hit"""
     
-    print("=== TESTING MISSING FIELDS SELECTORS ===")
-    print(f"URL: {response.url}")
+    print("=== TESTING MISSING FIELDS SELECTORS ===", file=out)
+    print(f"URL: {response.url}", file=out)
     
-    # Test BestSellerRank
-    print("\n1. BEST SELLER RANK:")
-    print("-" * 30)
+    # One walk collects the page text; :contains() probes for absent phrases are then skipped
+    page_text = PAGE_TEXT_XPATH(response.selector.root)
     
-    best_seller_tests = [
-        ('#SalesRank::text', 'SalesRank ID'),
-        ('#detailBullets_feature_div li:contains("Best Sellers Rank")::text', 'Detail bullets'),
-        ('#productDetails_detailBullets_sections1 tr:contains("Best Sellers Rank") td::text', 'Product details table'),
-        ('li:contains("Best Sellers Rank")::text', 'Any list item'),
-        ('span:contains("Best Sellers Rank")::text', 'Any span'),
-        ('*:contains("Best Sellers Rank")::text', 'Any element')
-    ]
+    # Test BestSellerRank
+    print(SECTION_HEADERS['BEST SELLER RANK'], file=out)
     
-    for selector, desc in best_seller_tests:
-        result = response.css(selector).get()
+    for desc, result in group_matches(BEST_SELLER_TESTS, response, page_text):
         if result:
-            print(f"✓ {desc}: {result.strip()}")
-            rank_match = re.search(r'#([\d,]+)', result)
+            print(f"✓ {desc}: {result.strip()}", file=out)
+            rank_match = RANK_PATTERN.search(result)
             if rank_match:
-                print(f"  Extracted rank: {rank_match.group(1)}")
+                print(f"  Extracted rank: {rank_match.group(1)}", file=out)
+                if not exhaustive:
+                    break
         else:
-            print(f"✗ {desc}: No result")
+            print(f"✗ {desc}: No result", file=out)
     
     # Check for #1 Best Seller badge
-    bestseller_badge = response.css('span:contains("#1 Best Seller")::text').get()
+    bestseller_badge = first_match(BESTSELLER_BADGE_SELECTOR, response, page_text)
     if bestseller_badge:
-        print(f"✓ Found #1 Best Seller badge: {bestseller_badge}")
+        print(f"✓ Found #1 Best Seller badge: {bestseller_badge}", file=out)
     
     # Test CustomerServiceProvider
-    print("\n2. CUSTOMER SERVICE PROVIDER:")
-    print("-" * 30)
+    print(SECTION_HEADERS['CUSTOMER SERVICE PROVIDER'], file=out)
     
-    csp_tests = [
-        ('#tabular-buybox tr:contains("Customer service") td::text', 'Tabular buybox'),
-        ('span:contains("Customer service")::text', 'Any span'),
-        ('tr:contains("Customer service") td::text', 'Any table row'),
-        ('*:contains("Customer service")::text', 'Any element')
-    ]
-    
-    for selector, desc in csp_tests:
-        result = response.css(selector).get()
+    for desc, result in group_matches(CSP_TESTS, response, page_text):
         if result:
-            print(f"✓ {desc}: {result.strip()}")
+            print(f"✓ {desc}: {result.strip()}", file=out)
+            if not exhaustive:
+                break
         else:
-            print(f"✗ {desc}: No result")
+            print(f"✗ {desc}: No result", file=out)
     
     # Test DispatchesFrom
-    print("\n3. DISPATCHES FROM:")
-    print("-" * 30)
-    
-    dispatch_tests = [
-        ('#tabular-buybox tr:contains("Dispatches from") td::text', 'Tabular buybox - Dispatches'),
-        ('#tabular-buybox tr:contains("Ships from") td::text', 'Tabular buybox - Ships'),
-        ('span:contains("Dispatches from")::text', 'Any span - Dispatches'),
-        ('span:contains("Ships from")::text', 'Any span - Ships'),
-        ('*:contains("Dispatches from")::text', 'Any element - Dispatches'),
-        ('*:contains("Ships from")::text', 'Any element - Ships')
-    ]
+    print(SECTION_HEADERS['DISPATCHES FROM'], file=out)
     
-    for selector, desc in dispatch_tests:
-        result = response.css(selector).get()
+    for desc, result in group_matches(DISPATCH_TESTS, response, page_text):
         if result:
             clean_result = result.strip().replace('Dispatches from ', '').replace('Ships from ', '').strip()
-            print(f"✓ {desc}: {clean_result}")
+            print(f"✓ {desc}: {clean_result}", file=out)
+            if not exhaustive:
+                break
         else:
-            print(f"✗ {desc}: No result")
+            print(f"✗ {desc}: No result", file=out)
     
     # Test ShippingCost
-    print("\n4. SHIPPING COST:")
-    print("-" * 30)
-    
-    shipping_tests = [
-        ('#mir-layout-DELIVERY_BLOCK', 'Main delivery block'),
-        ('#deliveryBlockMessage', 'Delivery message'),
-        ('#contextualIngressPt', 'Contextual ingress'),
-        ('#shippingMessageInsideBuyBox_feature_div', 'Shipping message buybox')
-    ]
+    print(SECTION_HEADERS['SHIPPING COST'], file=out)
     
-    for selector, desc in shipping_tests:
-        result = response.css(selector).get()
-        if result:
-            print(f"✓ {desc}: Found")
+    for desc, result in group_matches(SHIPPING_TESTS, response, page_text):
+        if result is not None:
+            print(f"✓ {desc}: Found", file=out)
             # Get text content
-            text_content = response.css(f"{selector} *::text").getall()
-            clean_text = ' '.join([t.strip() for t in text_content if t.strip()])
-            print(f"  Text: {clean_text[:100]}...")
+            text_content = DESCENDANT_TEXT_XPATH(result)
+            clean_text = ' '.join(s for s in (t.strip() for t in text_content) if s)
+            print(f"  Text: {clean_text[:100]}...", file=out)
             
             # Check for FREE
             if 'FREE' in clean_text.upper():
-                print(f"  🎯 FREE shipping detected!")
+                print(f"  🎯 FREE shipping detected!", file=out)
             
             # Check for cost
-            cost_match = re.search(r'£(\d+\.?\d*)', clean_text)
+            cost_match = SHIPPING_COST_PATTERN.search(clean_text)
             if cost_match:
-                print(f"  💰 Cost found: £{cost_match.group(1)}")
+                print(f"  💰 Cost found: £{cost_match.group(1)}", file=out)
+            if not exhaustive:
+                break
         else:
-            print(f"✗ {desc}: No result")
+            print(f"✗ {desc}: No result", file=out)
     
     # Test SellerOffersCount
-    print("\n5. SELLER OFFERS COUNT:")
-    print("-" * 30)
-    
-    offers_tests = [
-        ('#olp-upd-new-freeshipping a::text', 'OLP new freeshipping'),
-        ('#olp_feature_div a::text', 'OLP feature div'),
-        ('a:contains("new offers")::text', 'New offers link'),
-        ('span:contains("new offers")::text', 'New offers span'),
-        ('a:contains("used offers")::text', 'Used offers link'),
-        ('*:contains("offers")::text', 'Any offers text')
-    ]
+    print(SECTION_HEADERS['SELLER OFFERS COUNT'], file=out)
     
-    for selector, desc in offers_tests:
-        result = response.css(selector).get()
+    for desc, result in group_matches(OFFERS_TESTS, response, page_text):
         if result:
-            print(f"✓ {desc}: {result.strip()}")
-            offers_match = re.search(r'(\d+)', result)
+            print(f"✓ {desc}: {result.strip()}", file=out)
+            offers_match = OFFERS_COUNT_PATTERN.search(result)
             if offers_match:
-                print(f"  Offers count: {offers_match.group(1)}")
+                print(f"  Offers count: {offers_match.group(1)}", file=out)
+                if not exhaustive:
+                    break
         else:
-            print(f"✗ {desc}: No result")
+            print(f"✗ {desc}: No result", file=out)
     
     # Test ListingDate
-    print("\n6. LISTING DATE:")
-    print("-" * 30)
+    print(SECTION_HEADERS['LISTING DATE'], file=out)
     
-    date_tests = [
-        ('#productDetails_detailBullets_sections1 tr:contains("Date first available") td::text', 'Product details - Date'),
-        ('#productDetails_db_sections tr:contains("Date first available") td::text', 'Product DB - Date'),
-        ('li:contains("Date first available")::text', 'List item - Date'),
-        ('span:contains("Date first available")::text', 'Span - Date'),
-        ('*:contains("Date first available")::text', 'Any element - Date')
-    ]
-    
-    for selector, desc in date_tests:
-        result = response.css(selector).get()
+    for desc, result in group_matches(DATE_TESTS, response, page_text):
         if result:
             clean_date = result.strip().replace('Date first available:', '').strip()
-            print(f"✓ {desc}: {clean_date}")
+            print(f"✓ {desc}: {clean_date}", file=out)
+            if not exhaustive:
+                break
         else:
-            print(f"✗ {desc}: No result")
+            print(f"✗ {desc}: No result", file=out)
     
     # Test IsBuyBoxWinner
-    print("\n7. BUY BOX WINNER:")
-    print("-" * 30)
-    
-    buybox_tests = [
-        ('#merchant-info a::text', 'Merchant info link'),
-        ('#soldByThirdParty a::text', 'Sold by third party'),
-        ('span:contains("Sold by")::text', 'Sold by span'),
-        ('#tabular-buybox tr:contains("Sold by") td a::text', 'Tabular buybox sold by')
-    ]
+    print(SECTION_HEADERS['BUY BOX WINNER'], file=out)
     
-    for selector, desc in buybox_tests:
-        result = response.css(selector).get()
+    for desc, result in group_matches(BUYBOX_TESTS, response, page_text):
         if result:
-            print(f"✓ {desc}: {result.strip()}")
+            print(f"✓ {desc}: {result.strip()}", file=out)
+            if not exhaustive:
+                break
         else:
-            print(f"✗ {desc}: No result")
+            print(f"✗ {desc}: No result", file=out)
     
     # Test Delivery Days
-    print("\n8. DELIVERY DAYS:")
-    print("-" * 30)
+    print(SECTION_HEADERS['DELIVERY DAYS'], file=out)
     
     # Get all delivery text
-    delivery_selectors = [
-        '#mir-layout-DELIVERY_BLOCK *::text',
-        '#deliveryBlockMessage *::text',
-        '#contextualIngressPt *::text',
-        '#availability *::text'
-    ]
-    
-    all_delivery_text = []
-    for selector in delivery_selectors:
-        texts = response.css(selector).getall()
-        if texts:
-            all_delivery_text.extend(texts)
+    all_delivery_text = DELIVERY_TEXT_XPATH(response.selector.root)
     
     if all_delivery_text:
-        full_text = ' '.join([t.strip() for t in all_delivery_text if t.strip()])
-        print(f"Full delivery text: {full_text[:200]}...")
+        full_text = ' '.join(s for s in (t.strip() for t in all_delivery_text) if s)
+        print(f"Full delivery text: {full_text[:200]}...", file=out)
         
         # Test patterns
         if 'tomorrow' in full_text.lower():
-            print("✓ Tomorrow delivery detected (1 day)")
+            print("✓ Tomorrow delivery detected (1 day)", file=out)
         elif 'today' in full_text.lower():
-            print("✓ Today delivery detected (0 days)")
+            print("✓ Today delivery detected (0 days)", file=out)
         
-        days_match = re.search(r'(\d+)[-–]?(\d+)?\s*days?', full_text.lower())
+        days_match = DELIVERY_DAYS_PATTERN.search(full_text.lower())
         if days_match:
             fastest = int(days_match.group(1))
             slowest = int(days_match.group(2)) if days_match.group(2) else fastest
-            print(f"✓ Delivery days found: {fastest}-{slowest} days")
+            print(f"✓ Delivery days found: {fastest}-{slowest} days", file=out)
     else:
-        print("✗ No delivery text found")
+        print("✗ No delivery text found", file=out)
     
     # Additional debugging
-    print("\n9. GENERAL PAGE CHECKS:")
-    print("-" * 30)
+    print(SECTION_HEADERS['GENERAL PAGE CHECKS'], file=out)
     
     # Check if common sections exist
-    sections_to_check = {
-        '#productDetails_detailBullets_sections1': 'Product Details Section 1',
-        '#productDetails_db_sections': 'Product DB Sections',
-        '#tabular-buybox': 'Tabular Buybox',
-        '#merchant-info': 'Merchant Info',
-        '#mir-layout-DELIVERY_BLOCK': 'Delivery Block',
-        '#availability': 'Availability Section'
-    }
-    
-    for selector, name in sections_to_check.items():
-        if response.css(selector).get():
-            print(f"✓ {name}: Found")
+    found_sections = set(SECTION_IDS_XPATH(response.selector.root))
+    for section_id, name in SECTIONS_TO_CHECK.items():
+        if section_id in found_sections:
+            print(f"✓ {name}: Found", file=out)
         else:
-            print(f"✗ {name}: Missing")
-    
-    # Check for common text patterns
-    text_patterns = [
-        'Best Sellers Rank',
-        'Customer service',
-        'Dispatches from',
-        'Ships from',
-        'FREE delivery',
-        'Date first available',
-        'new offers',
-        'Sold by'
-    ]
-    
-    print(f"\nText patterns found in page:")
-    for pattern in text_patterns:
-        if pattern in response.text:
-            print(f"✓ '{pattern}' found in page")
+            print(f"✗ {name}: Missing", file=out)
+    
+    # Check for common text patterns, all found in one scan of the page
+    found_patterns = set()
+    for match in TEXT_PATTERNS_RE.finditer(response.text):
+        found_patterns.add(match.group())
+        if len(found_patterns) == len(TEXT_PATTERNS):
+            break
+    
+    print(f"\nText patterns found in page:", file=out)
+    for pattern in TEXT_PATTERNS:
+        if pattern in found_patterns:
+            print(f"✓ '{pattern}' found in page", file=out)
         else:
-            print(f"✗ '{pattern}' not found in page")
+            print(f"✗ '{pattern}' not found in page", file=out)
 
-def quick_test_all_fields(response):
+@buffered_output
+def quick_test_all_fields(response, out=None):
     """Quick test of all fields with basic selectors"""
     
-    print("\n=== QUICK TEST ALL FIELDS ===")
+    print("\n=== QUICK TEST ALL FIELDS ===", file=out)
     
     # Quick field tests
+    quick_fields = read_quick_fields(response)
     fields = {
-        'ASIN': lambda r: re.search(r'/dp/([A-Z0-9]{10})', r.url).group(1) if re.search(r'/dp/([A-Z0-9]{10})', r.url) else None,
-        'Title': lambda r: r.css('#productTitle::text').get(),
-        'Price': lambda r: r.css('.a-price .a-offscreen::text').get(),
-        'StarRating': lambda r: r.css('[data-hook="average-star-rating"] .a-icon-alt::text').get(),
-        'Brand': lambda r: r.css('#bylineInfo::text').get(),
-        'Prime': lambda r: 'prime' in r.text.lower(),
-        'Availability': lambda r: r.css('#availability span::text').get()
+        'ASIN': lambda r: next(iter(ASIN_PATTERN.findall(r.url)), None),
+        'Title': lambda r: quick_fields.get('Title'),
+        'Price': lambda r: quick_fields.get('Price'),
+        'StarRating': lambda r: quick_fields.get('StarRating'),
+        'Brand': lambda r: quick_fields.get('Brand'),
+        'Prime': lambda r: PRIME_PATTERN.search(r.body) is not None,
+        'Availability': lambda r: quick_fields.get('Availability')
     }
     
     for field, extractor in fields.items():
         try:
             result = extractor(response)
             if result:
-                print(f"✓ {field}: {str(result)[:50]}...")
+                print(f"✓ {field}: {str(result)[:50]}...", file=out)
             else:
-                print(f"✗ {field}: No result")
+                print(f"✗ {field}: No result", file=out)
         except Exception as e:
-            print(f"✗ {field}: Error - {str(e)}")
+            print(f"✗ {field}: Error - {str(e)}", file=out)
+
+def missing_fields_report(response, exhaustive=False):
+    """test_missing_fields_selectors' report for one response, as a string"""
+    out = io.StringIO()
+    test_missing_fields_selectors(response, exhaustive=exhaustive, out=out)
+    return out.getvalue()
+
+def audit_many(responses, max_workers=8, exhaustive=False):
+    """Build missing-field reports for several responses on a thread pool and print them in order"""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        reports = executor.map(partial(missing_fields_report, exhaustive=exhaustive), responses)
+        sys.stdout.write(''.join(reports))
+    sys.stdout.flush()
 
 # Instructions for use
 if __name__ == "__main__":
@@ -280,8 +432,14 @@ if __name__ == "__main__":
     2. In the shell, run:
        exec(open('test_selectors.py').read())
        test_missing_fields_selectors(response)
+       test_missing_fields_selectors(response, exhaustive=True)  # report every selector
        quick_test_all_fields(response)
     
     3. Try with different products:
        scrapy shell "https://www.amazon.co.uk/dp/ANOTHER_ASIN"
+    
+    4. To audit several product pages at once, keep each response after fetch():
+       pages = [response]
+       fetch("https://www.amazon.co.uk/dp/ANOTHER_ASIN"); pages.append(response)
+       audit_many(pages)
     """)
\ No newline at end of file